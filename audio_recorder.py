@@ -33,6 +33,8 @@ except ImportError:
     WHISPER_AVAILABLE = False
     print("⚠ openai-whisper not available. Install: pip install openai-whisper")
 
+from notes_json import write_notes_json
+
 # ─── Constants ────────────────────────────────────────────────────────────────
 SAMPLE_RATE        = 16000   # Whisper expects 16 kHz
 CHUNK_SECONDS      = 30      # Each audio chunk length in seconds
@@ -65,10 +67,7 @@ def save_notes(notes_file: str, segments: list, full_transcript: str):
         "segments": segments,
         "full_transcript": full_transcript,
     }
-    tmp = notes_file + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-    os.replace(tmp, notes_file)
+    write_notes_json(notes_file, data)
 
 
 # ─── Recording thread ─────────────────────────────────────────────────────────
@@ -0,0 +1,25 @@
+"""
+Class notes JSON writer shared by audio_recorder.py, student_monitor.py and streamlit_app.py
+orjson writes the transcript in one native pass; stdlib json is the fallback.
+"""
+
+import json
+import os
+
+try:
+    import orjson
+
+    def notes_json_bytes(notes) -> bytes:
+        return orjson.dumps(notes, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def notes_json_bytes(notes) -> bytes:
+        # Same 2-space layout as the orjson branch
+        return json.dumps(notes, indent=2, ensure_ascii=False, check_circular=False).encode('utf-8')
+
+
+def write_notes_json(notes_file, notes):
+    """Write notes to notes_file atomically (tmp file + os.replace)"""
+    tmp = f"{notes_file}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(notes_json_bytes(notes))
+    os.replace(tmp, notes_file)
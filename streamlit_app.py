@@ -6,16 +6,18 @@ Admin interface for monitoring students and viewing reports
 import streamlit as st
 import os
 import json
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import altair as alt
 from datetime import datetime
 import zipfile
 import shutil
 from pathlib import Path
 import subprocess
+import sys
 import time
 import threading
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 # Load .env (Gemini API key etc.)
 try:
@@ -26,6 +28,24 @@ except ImportError:
 
 import re
 import io
+import hashlib
+from notes_json import write_notes_json
+
+# orjson parses/serialises reports several times faster; stdlib json is the fallback
+try:
+    import orjson
+
+    def _json_loads(raw: bytes):
+        return orjson.loads(raw)
+
+    def _json_dumps_pretty(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _json_loads(raw: bytes):
+        return json.loads(raw)
+
+    def _json_dumps_pretty(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
 
 # ── Gemini helper ─────────────────────────────────────────────────────────────
 def _gemini_available():
@@ -134,246 +154,34 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
-<style>
-    /* ── Google Font ─────────────────────────────────────────── */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap');
-
-    html, body, [class*="css"] {
-        font-family: 'Inter', sans-serif;
-        font-size: 16px;
-    }
-
-    /* ── Page background ─────────────────────────────────────── */
-    .stApp {
-        background: linear-gradient(135deg, #f0f4ff 0%, #faf0ff 50%, #f0fff4 100%);
-    }
-
-    /* ── Main hero header ────────────────────────────────────── */
-    .main-header {
-        font-size: 3rem;
-        font-weight: 800;
-        text-align: center;
-        margin-bottom: 1.8rem;
-        letter-spacing: -0.5px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 40%, #f093fb 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        text-shadow: none;
-        padding: 0.4rem 0;
-    }
-
-    /* ── Section subheaders ──────────────────────────────────── */
-    h2, h3 {
-        font-size: 1.45rem !important;
-        font-weight: 700 !important;
-        color: #3d3d6e !important;
-        letter-spacing: -0.2px;
-    }
-
-    /* ── Generic card ────────────────────────────────────────── */
-    .metric-card {
-        background: linear-gradient(135deg, #ffffff 0%, #f3f4ff 100%);
-        border: 1px solid #dde1ff;
-        padding: 1.2rem 1.4rem;
-        border-radius: 14px;
-        margin: 0.6rem 0;
-        box-shadow: 0 3px 12px rgba(102, 126, 234, 0.10);
-        font-size: 1.05rem;
-        transition: transform 0.15s ease, box-shadow 0.15s ease;
-    }
-    .metric-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.18);
-    }
-    .metric-card h3 {
-        color: #4a4aaa !important;
-        font-size: 1.1rem !important;
-        margin-bottom: 0.3rem;
-    }
-    .metric-card p {
-        color: #555577;
-        font-size: 0.95rem;
-        margin: 0;
-    }
-
-    /* ── Student present / absent pills ─────────────────────── */
-    .student-present {
-        background: linear-gradient(135deg, #d4edda, #a8f0be);
-        border-left: 4px solid #28a745;
-        padding: 0.6rem 1rem;
-        border-radius: 8px;
-        margin: 0.3rem 0;
-        font-size: 1rem;
-        color: #155724;
-        font-weight: 600;
-    }
-    .student-absent {
-        background: linear-gradient(135deg, #f8d7da, #ffc0cb);
-        border-left: 4px solid #dc3545;
-        padding: 0.6rem 1rem;
-        border-radius: 8px;
-        margin: 0.3rem 0;
-        font-size: 1rem;
-        color: #721c24;
-        font-weight: 600;
-    }
-
-    /* ── Focus labels ────────────────────────────────────────── */
-    .good-focus {
-        color: #15803d;
-        font-weight: 700;
-        font-size: 1.05rem;
-    }
-    .poor-focus {
-        color: #b91c1c;
-        font-weight: 700;
-        font-size: 1.05rem;
-    }
-
-    /* ── Streamlit metric widget ─────────────────────────────── */
-    [data-testid="metric-container"] {
-        background: linear-gradient(135deg, #ffffff, #f0f4ff);
-        border: 1px solid #d0d8ff;
-        border-radius: 14px;
-        padding: 1rem 1.2rem;
-        box-shadow: 0 2px 10px rgba(102,126,234,0.08);
-    }
-    [data-testid="metric-container"] label {
-        font-size: 0.92rem !important;
-        color: #6b7280 !important;
-        font-weight: 600 !important;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    [data-testid="metric-container"] [data-testid="stMetricValue"] {
-        font-size: 2rem !important;
-        font-weight: 800 !important;
-        color: #4338ca !important;
-    }
-
-    /* ── Buttons ─────────────────────────────────────────────── */
-    .stButton > button {
-        font-size: 1rem !important;
-        font-weight: 700 !important;
-        border-radius: 10px !important;
-        padding: 0.55rem 1.4rem !important;
-        transition: all 0.2s ease !important;
-        letter-spacing: 0.2px;
-    }
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #667eea, #764ba2) !important;
-        border: none !important;
-        color: white !important;
-        box-shadow: 0 4px 14px rgba(102, 126, 234, 0.45) !important;
-    }
-    .stButton > button[kind="primary"]:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 7px 20px rgba(102, 126, 234, 0.55) !important;
-    }
-    .stButton > button[kind="secondary"] {
-        background: linear-gradient(135deg, #ff6b6b, #ee0979) !important;
-        border: none !important;
-        color: white !important;
-        box-shadow: 0 4px 14px rgba(238, 9, 121, 0.3) !important;
-    }
-    .stButton > button[kind="secondary"]:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 7px 20px rgba(238, 9, 121, 0.45) !important;
-    }
-
-    /* ── Sidebar ─────────────────────────────────────────────── */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #1a1a4e 0%, #2d2d7e 50%, #3d1a6e 100%) !important;
-    }
-    [data-testid="stSidebar"] * {
-        color: #e8e8ff !important;
-    }
-    [data-testid="stSidebar"] .stRadio label {
-        font-size: 1.05rem !important;
-        font-weight: 600 !important;
-        padding: 0.35rem 0 !important;
-    }
-    [data-testid="stSidebar"] hr {
-        border-color: rgba(255,255,255,0.15) !important;
-    }
-    [data-testid="stSidebar"] h1,
-    [data-testid="stSidebar"] h2,
-    [data-testid="stSidebar"] h3 {
-        color: #ffffff !important;
-        font-weight: 800 !important;
-    }
-    [data-testid="stSidebar"] [data-testid="metric-container"] {
-        background: rgba(255,255,255,0.1) !important;
-        border-color: rgba(255,255,255,0.2) !important;
-    }
-    [data-testid="stSidebar"] [data-testid="stMetricValue"] {
-        color: #a5f3fc !important;
-    }
-
-    /* ── Alert / info boxes ──────────────────────────────────── */
-    [data-testid="stAlert"] {
-        border-radius: 12px !important;
-        font-size: 1rem !important;
-        font-weight: 500 !important;
-    }
-
-    /* ── Dataframe / table ───────────────────────────────────── */
-    [data-testid="stDataFrame"] {
-        border-radius: 12px !important;
-        overflow: hidden;
-        font-size: 1rem !important;
-    }
-
-    /* ── Text inputs / selects ───────────────────────────────── */
-    .stTextInput input, .stSelectbox select, .stNumberInput input {
-        font-size: 1rem !important;
-        border-radius: 8px !important;
-    }
-
-    /* ── Progress bar ────────────────────────────────────────── */
-    [data-testid="stProgressBar"] > div > div {
-        background: linear-gradient(90deg, #667eea, #f093fb) !important;
-        border-radius: 999px !important;
-    }
+# Custom CSS — read from disk once per server process, re-emitted each rerun
+@st.cache_data(show_spinner=False)
+def _load_css() -> str:
+    """Return the dashboard stylesheet wrapped in a <style> tag."""
+    css_path = Path(__file__).with_name("dashboard.css")
+    return f"<style>\n{css_path.read_text(encoding='utf-8')}</style>"
 
-    /* ── Expander ────────────────────────────────────────────── */
-    details summary {
-        font-size: 1rem !important;
-        font-weight: 600 !important;
-    }
 
-    /* ── Footer ──────────────────────────────────────────────── */
-    .footer-bar {
-        text-align: center;
-        padding: 0.8rem;
-        font-size: 0.95rem;
-        color: #6b7280;
-        background: linear-gradient(135deg, #f0f4ff, #faf0ff);
-        border-radius: 12px;
-        margin-top: 1rem;
-        border: 1px solid #e0e0ff;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(_load_css(), unsafe_allow_html=True)
 
 # Initialize session state
-if 'monitoring_active' not in st.session_state:
-    st.session_state.monitoring_active = False
-if 'monitoring_process' not in st.session_state:
-    st.session_state.monitoring_process = None
-if 'audio_process' not in st.session_state:
-    st.session_state.audio_process = None
-if 'session_id' not in st.session_state:
-    st.session_state.session_id = None
-if 'monitoring_start_time' not in st.session_state:
-    st.session_state.monitoring_start_time = None
-if 'focus_threshold' not in st.session_state:
-    st.session_state.focus_threshold = 50
-if 'class_duration' not in st.session_state:
-    st.session_state.class_duration = 300
+_SESSION_DEFAULTS = {
+    'monitoring_active': False,
+    'monitoring_process': None,
+    'audio_process': None,
+    'session_id': None,
+    'monitoring_start_time': None,
+    'focus_threshold': 50,
+    'class_duration': 300,
+    'stopping': False,
+    'stop_requested_at': None,
+    'just_finished': False,
+    'starting': False,
+    'start_error': None,
+    'audio_error': None,
+}
+for _key, _default in _SESSION_DEFAULTS.items():
+    st.session_state.setdefault(_key, _default)
 
 class StudentMonitorDashboard:
     def __init__(self):
@@ -392,21 +200,16 @@ class StudentMonitorDashboard:
     
     def get_all_reports(self):
         """Get all report files"""
-        reports = []
         try:
-            files = os.listdir(self.reports_dir)
-            for file in files:
-                if file.startswith('focus_report_') and file.endswith('.json'):
-                    reports.append(file)
+            return sorted((p.name for p in Path(self.reports_dir).glob('focus_report_*.json')), reverse=True)
         except Exception as e:
             print(f"Error reading reports directory: {e}")
-        return sorted(reports, reverse=True)
+            return []
     
     def load_report(self, report_file):
         """Load a report JSON file"""
         try:
-            with open(os.path.join(self.reports_dir, report_file), 'r') as f:
-                return json.load(f)
+            return _json_loads(Path(self.reports_dir, report_file).read_bytes())
         except Exception as e:
             st.error(f"Error loading report: {e}")
             return None
@@ -420,6 +223,23 @@ class StudentMonitorDashboard:
             st.error(f"Error deleting report: {e}")
             return False
     
+    def delete_reports(self, report_files):
+        """Delete several report files with one directory scan; returns how many were removed"""
+        wanted = set(report_files)
+        deleted = 0
+        try:
+            with os.scandir(self.reports_dir) as entries:
+                for entry in entries:
+                    if entry.name in wanted:
+                        try:
+                            os.remove(entry.path)
+                            deleted += 1
+                        except OSError as e:
+                            st.error(f"Error deleting {entry.name}: {e}")
+        except OSError as e:
+            st.error(f"Error reading reports directory: {e}")
+        return deleted
+    
     def start_monitoring(self, duration, threshold):
         """Start the monitoring process"""
         # Update the student_monitor.py configuration
@@ -435,9 +255,479 @@ class StudentMonitorDashboard:
         # For now, we'll indicate it should be run
         return config
 
+@st.cache_data(show_spinner=False)
+def _report_label(report_path, mtime):
+    """Selectbox label for a report; recomputed only when the file's mtime changes."""
+    report_file = os.path.basename(report_path)
+    try:
+        timestamp = _json_loads(Path(report_path).read_bytes()).get('timestamp', report_file)
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return f"{dt.strftime('%B %d, %Y at %I:%M %p')} ({report_file})"
+    except Exception:
+        return report_file
+
 # Initialize dashboard
 dashboard = StudentMonitorDashboard()
 
+_px_mod = None
+
+
+def _px():
+    """plotly.express, imported on first use so pages without charts start faster."""
+    global _px_mod
+    if _px_mod is None:
+        import plotly.express as px
+        _px_mod = px
+    return _px_mod
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _registered_students(_dashboard):
+    """Registered student names, re-listed from disk at most every 30 seconds."""
+    return _dashboard.get_registered_students()
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _all_reports(_dashboard):
+    """Report filenames, newest first; call _all_reports.clear() after adding or deleting one."""
+    return _dashboard.get_all_reports()
+
+# ── Session start (subprocesses spawned off the script thread) ────────────────
+MONITOR_CONFIG_FILE = 'monitor_config.json'
+
+
+def _write_monitor_config(config):
+    """Atomically write monitor_config.json, skipping the write if it is unchanged."""
+    payload = json.dumps(config, indent=4).encode('utf-8')
+    config_path = Path(MONITOR_CONFIG_FILE)
+    try:
+        if config_path.read_bytes() == payload:
+            return
+    except OSError:
+        pass
+    tmp_path = config_path.with_name(config_path.name + '.tmp')
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, config_path)
+
+
+
+def _spawn_session(session_id):
+    """Launch student_monitor.py and audio_recorder.py; runs in a worker thread."""
+    creationflags = subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
+    try:
+        process = subprocess.Popen(
+            [sys.executable, 'student_monitor.py'],
+            cwd=os.getcwd(),
+            creationflags=creationflags
+        )
+    except Exception as e:
+        st.session_state.start_error = str(e)
+        st.session_state.starting = False
+        return
+
+    # Start audio recorder alongside the monitoring session
+    try:
+        st.session_state.audio_process = subprocess.Popen(
+            [sys.executable, 'audio_recorder.py', '--session-id', session_id],
+            cwd=os.getcwd(),
+            creationflags=creationflags
+        )
+    except Exception as ae:
+        st.session_state.audio_error = str(ae)
+        st.session_state.audio_process = None
+
+    st.session_state.monitoring_process = process
+    st.session_state.monitoring_active = True
+    st.session_state.monitoring_start_time = datetime.now()
+    st.session_state.starting = False
+
+
+def _start_session_async(session_id):
+    """Run _spawn_session in a daemon thread bound to this script run's context."""
+    st.session_state.starting = True
+    st.session_state.start_error = None
+    st.session_state.audio_error = None
+    worker = threading.Thread(target=_spawn_session, args=(session_id,), daemon=True)
+    add_script_run_ctx(worker)
+    worker.start()
+
+
+@st.fragment(run_every=0.5)
+def _start_progress():
+    """Show a spinner until the spawn thread has published the process handles."""
+    if not st.session_state.starting:
+        st.rerun()
+    st.info("🔄 Starting monitoring session...")
+
+
+# ── End-session handshake ─────────────────────────────────────────────────────
+STOP_SIGNAL_FILE = 'monitor_stop.signal'
+STOP_GRACE_SECONDS = 5    # time allowed for the stop-signal handshake before SIGTERM
+STOP_KILL_SECONDS = 15    # force-kill the monitor if it is still alive after this
+
+
+def _request_stop():
+    """Write the stop signal file and hand off to the _stop_progress fragment."""
+    try:
+        with open(STOP_SIGNAL_FILE, 'w') as f:
+            f.write('stop')
+    except OSError as e:
+        st.error(f"❌ Error stopping session: {e}")
+    st.session_state.stopping = True
+    st.session_state.stop_requested_at = time.time()
+
+
+def _finish_session():
+    """Stop the audio recorder and reset all monitoring session state."""
+    audio_process = st.session_state.audio_process
+    if audio_process and audio_process.poll() is None:
+        try:
+            audio_process.terminate()
+        except Exception:
+            try:
+                audio_process.kill()
+            except Exception:
+                pass
+    st.session_state.monitoring_active = False
+    st.session_state.monitoring_process = None
+    st.session_state.audio_process = None
+    st.session_state.monitoring_start_time = None
+    st.session_state.stopping = False
+    st.session_state.stop_requested_at = None
+    st.session_state.just_finished = True
+    _all_reports.clear()
+
+
+@st.fragment(run_every=0.5)
+def _stop_progress():
+    """Poll the monitor process until it exits, escalating to terminate/kill."""
+    process = st.session_state.monitoring_process
+    if process is None or process.poll() is not None:
+        _finish_session()
+        st.rerun()
+
+    waited = time.time() - st.session_state.stop_requested_at
+    try:
+        if waited >= STOP_KILL_SECONDS:
+            process.kill()
+        elif waited >= STOP_GRACE_SECONDS:
+            process.terminate()
+    except Exception:
+        pass
+
+    if waited >= STOP_GRACE_SECONDS:
+        status = "⚠️ Process taking too long, asking it to terminate..."
+    else:
+        status = "⏳ Ending session and generating report..."
+    st.progress(min(1.0, waited / STOP_KILL_SECONDS), text=f"{status} ({int(waited)}s)")
+
+def _data_key(obj) -> str:
+    """Stable content hash of a JSON-serialisable object, used as a cache key."""
+    payload = json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _focus_distribution_figure(data_key, threshold, _students_data):
+    """Home-page focus bar chart, rebuilt only when the report data changes."""
+    focus_data = pd.DataFrame({
+        'Student': list(_students_data.keys()),
+        'Focus %': [data['focus_percentage'] for data in _students_data.values()]
+    })
+    fig = _px().bar(
+        focus_data,
+        x='Student',
+        y='Focus %',
+        color='Focus %',
+        color_continuous_scale=['red', 'yellow', 'green'],
+        title='Student Focus Percentage'
+    )
+    fig.add_hline(y=threshold, line_dash="dash",
+                 line_color="red", annotation_text="Threshold")
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _numeric_frame(students_json, mobile_enabled):
+    """
+    Build the per-student table (without Status) and the focus bar-chart data.
+
+    Keyed on the serialised students dict, so reruns that show the same
+    report reuse the cached frames; the threshold is applied by _with_status.
+    Returns (student_df, focus_chart_data), both sorted by focus descending.
+    """
+    students_data = json.loads(students_json)
+    names, focus, focused, unfocused, total, mobile = [], [], [], [], [], []
+    for name, d in students_data.items():
+        names.append(name)
+        focus.append(d['focus_percentage'])
+        focused.append(d['focused_count'])
+        unfocused.append(d['unfocused_count'])
+        total.append(d['total_checks'])
+        mobile.append(d.get('mobile_detected', 0))
+    
+    focus_pct = np.asarray(focus, dtype=np.float64)
+    columns = {
+        'Student': names,
+        'Focus %': focus_pct,
+        'Focused': focused,
+        'Unfocused': unfocused,
+        'Total Checks': total,
+    }
+    if mobile_enabled:
+        columns['Mobile Detected'] = mobile
+    student_df = pd.DataFrame(columns)
+    
+    # Keep 'Focus %' numeric so sorting is numeric; it is formatted at render time
+    student_df = student_df.sort_values('Focus %', ascending=False, kind='mergesort')
+    
+    focus_chart_data = student_df[['Student', 'Focus %']].rename(
+        columns={'Focus %': 'Focus Percentage'}
+    )
+    
+    return student_df, focus_chart_data
+
+
+def _with_status(student_df, threshold):
+    """Return a copy of the student table with the pass/fail Status column for threshold."""
+    return student_df.assign(
+        Status=np.where(student_df['Focus %'].to_numpy() >= threshold, '✅ Pass', '❌ Fail')
+    )
+
+
+# Report charts follow the container width; the toolbar is cut down to PNG export
+REPORT_CHART_CONFIG = {'displaylogo': False, 'modeBarButtons': [['toImage']]}
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _focus_comparison_figure(students, focus, threshold):
+    """Report focus comparison bar chart, built once per set of values."""
+    fig = _px().bar(
+        pd.DataFrame({'Student': students, 'Focus Percentage': focus}),
+        x='Student',
+        y='Focus Percentage',
+        color='Focus Percentage',
+        color_continuous_scale=['red', 'yellow', 'green'],
+        title='Student Focus Percentage Comparison'
+    )
+    fig.add_hline(y=threshold, line_dash="dash", line_color="red",
+                 annotation_text=f"Threshold ({threshold}%)")
+    fig.update_layout(height=450)
+    return fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _pie_figure(labels, counts, names, color_map, title):
+    """Report pie chart, built once per set of slice counts."""
+    df = pd.DataFrame({names: labels, 'Count': counts})
+    fig = _px().pie(df, values='Count', names=names, color=names,
+                    color_discrete_map=color_map, title=title)
+    fig.update_layout(height=400)
+    return fig
+
+
+LARGE_CLASS_CHART_SIZE = 100  # above this many students, draw bars on a canvas
+SMALL_TABLE_ROWS = 40  # up to this many students, use a static st.table
+
+
+def _render_focus_comparison(focus_chart_data, threshold):
+    """
+    Draw the per-student focus bar chart.
+
+    Plotly renders one SVG node per bar, which gets slow for big classes, so
+    beyond LARGE_CLASS_CHART_SIZE students an Altair chart with the canvas
+    renderer is used instead.
+    """
+    if len(focus_chart_data) <= LARGE_CLASS_CHART_SIZE:
+        fig = _focus_comparison_figure(tuple(focus_chart_data['Student']),
+                                       tuple(focus_chart_data['Focus Percentage']), threshold)
+        st.plotly_chart(fig, use_container_width=True, config=REPORT_CHART_CONFIG)
+        return
+
+    bars = alt.Chart(focus_chart_data).mark_bar().encode(
+        x=alt.X('Student:N', sort=None),
+        y=alt.Y('Focus Percentage:Q'),
+        color=alt.Color('Focus Percentage:Q', scale=alt.Scale(range=['red', 'yellow', 'green'])),
+        tooltip=['Student', 'Focus Percentage']
+    )
+    threshold_rule = alt.Chart(pd.DataFrame({'Threshold': [threshold]})).mark_rule(
+        color='red', strokeDash=[6, 4]
+    ).encode(y='Threshold:Q')
+    chart = (bars + threshold_rule).properties(
+        title=f'Student Focus Percentage Comparison (threshold {threshold}%)',
+        usermeta={'embedOptions': {'renderer': 'canvas'}}
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
+def _sync_monitor_state():
+    """Reset session state once if the monitor process has exited on its own."""
+    process = st.session_state.monitoring_process
+    if (st.session_state.monitoring_active and not st.session_state.stopping
+            and process is not None and process.poll() is not None):
+        _finish_session()
+
+
+@st.fragment
+def _render_report(report_data, registered_students):
+    """Render the body of a loaded report; widget reruns stay inside this fragment."""
+    # Report Summary
+    students_data = report_data.get('students', {})
+    threshold = report_data.get('threshold', 50)
+    duration = report_data.get('duration', 0)
+    
+    # Key Metrics
+    st.subheader("📊 Session Summary")
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    total_registered = len(registered_students)
+    students_present = len(students_data)
+    attendance_rate = (students_present / total_registered * 100) if total_registered > 0 else 0
+    
+    focus = np.fromiter((s['focus_percentage'] for s in students_data.values()),
+                        dtype=np.float64, count=students_present)
+    avg_focus = float(focus.mean()) if students_present else 0
+    students_above = int(np.count_nonzero(focus >= threshold))
+    students_below = students_present - students_above
+    
+    mobile_enabled = report_data.get('mobile_detection_enabled', False)
+    if mobile_enabled:
+        mobile = np.fromiter((s.get('mobile_detected', 0) for s in students_data.values()),
+                             dtype=np.int64, count=students_present)
+        total_mobile = int(mobile.sum())
+    else:
+        total_mobile = 0
+    
+    with col1:
+        st.metric("⏱️ Duration", f"{duration // 60} min")
+    
+    with col2:
+        st.metric("👥 Attendance", f"{students_present}/{total_registered}", 
+                 delta=f"{attendance_rate:.0f}%")
+    
+    with col3:
+        st.metric("📊 Avg Focus", f"{avg_focus:.1f}%",
+                 delta="Good" if avg_focus >= threshold else "Low")
+    
+    with col4:
+        st.metric("✅ Passed", students_above, 
+                 delta=f"{(students_above/max(1,students_present)*100):.0f}%")
+    
+    with col5:
+        if mobile_enabled:
+            st.metric("📱 Mobile Use", total_mobile,
+                     delta="None" if total_mobile == 0 else "Detected", delta_color="inverse")
+        else:
+            st.metric("📱 Mobile Detection", "Disabled")
+    
+    # Detailed Statistics
+    st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("📈 Focus Performance")
+        
+        # Focus distribution pie chart
+        fig = _pie_figure(('Above Threshold', 'Below Threshold'),
+                          (students_above, students_below), 'Category',
+                          {'Above Threshold': 'green', 'Below Threshold': 'red'},
+                          f'Students vs {threshold}% Threshold')
+        st.plotly_chart(fig, use_container_width=True, config=REPORT_CHART_CONFIG)
+    
+    with col2:
+        st.subheader("👥 Attendance Overview")
+        
+        # Attendance pie chart
+        fig = _pie_figure(('Present', 'Absent'),
+                          (students_present, total_registered - students_present), 'Status',
+                          {'Present': 'lightblue', 'Absent': 'lightgray'},
+                          'Attendance Distribution')
+        st.plotly_chart(fig, use_container_width=True, config=REPORT_CHART_CONFIG)
+    
+    # Student-wise Details
+    st.markdown("---")
+    st.subheader("👤 Individual Student Performance")
+    
+    student_df, focus_chart_data = _numeric_frame(json.dumps(students_data), mobile_enabled)
+    student_df = _with_status(student_df, threshold)
+    
+    if len(student_df) <= SMALL_TABLE_ROWS:
+        # Plain HTML table: no Arrow grid component for a handful of rows
+        st.table(student_df.assign(
+            **{'Focus %': student_df['Focus %'].map('{:.1f}%'.format)}
+        ).reset_index(drop=True))
+    else:
+        st.dataframe(
+            student_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={'Focus %': st.column_config.NumberColumn(format="%.1f%%")}
+        )
+    
+    # Focus Bar Chart
+    st.subheader("📊 Focus Comparison")
+    
+    _render_focus_comparison(focus_chart_data, threshold)
+    
+    # Mobile Phone Usage (total_mobile is 0 unless the feature was enabled)
+    if total_mobile > 0:
+        st.markdown("---")
+        st.subheader("📱 Mobile Phone Detections")
+        
+        mobile_students = student_df.loc[student_df['Mobile Detected'] > 0, 'Student'].tolist()
+        st.warning(f"⚠️ **{len(mobile_students)} student(s) REPORTED for mobile phone use!**")
+        
+        mobile_df = pd.DataFrame({
+            'Student': mobile_students,
+            'Detections': [students_data[name]['mobile_detected'] for name in mobile_students],
+            'Times': ['; '.join(students_data[name].get('mobile_times', [])) for name in mobile_students]
+        })
+        st.dataframe(mobile_df, use_container_width=True, hide_index=True)
+    
+    # Absent Students (stored in the report since it was saved; recomputed for older reports)
+    absent_students = report_data.get('absent_students')
+    if absent_students is None:
+        if not registered_students:
+            return
+        absent_students = sorted(frozenset(registered_students).difference(students_data))
+    if not absent_students:
+        return
+    
+    st.markdown("---")
+    st.subheader("🚫 Absent Students")
+    
+    absent_cols = st.columns(min(5, len(absent_students)))
+    chunks = [absent_students[i::len(absent_cols)] for i in range(len(absent_cols))]
+    for col, chunk in zip(absent_cols, chunks):
+        with col:
+            for student in chunk:
+                st.error(f"❌ {student}")
+
+
+@st.fragment
+def _report_management():
+    """Report management buttons, rerun on their own without the rest of Settings."""
+    st.subheader("🗂️ Report Management")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        confirm = st.checkbox("⚠️ Confirm deletion of all reports")
+        if st.button("🗑️ Delete All Reports", type="secondary", disabled=not confirm):
+            deleted = dashboard.delete_reports(_all_reports(dashboard))
+            _all_reports.clear()
+            st.success(f"✅ Deleted {deleted} reports")
+            st.rerun()
+    
+    with col2:
+        if st.button("📥 Export All Reports"):
+            st.info("📦 Export functionality - Coming soon!")
+
+
+_sync_monitor_state()
+
 # Sidebar Navigation
 st.sidebar.image("https://img.icons8.com/fluency/96/000000/student-center.png", width=100)
 st.sidebar.title("📊 Navigation")
@@ -458,29 +748,28 @@ page = st.sidebar.radio(
     ["🏠 Home", "👥 Students", "▶️ Start Monitoring", "📈 View Reports", "📝 Notes", "⚙️ Settings"]
 )
 
+# End-session progress / completion banner (shown on every page)
+if st.session_state.stopping:
+    _stop_progress()
+elif st.session_state.just_finished:
+    st.session_state.just_finished = False
+    st.success("✅ Monitoring session completed!")
+    st.info("📊 Go to 'View Reports' to see the generated report.")
+
 # Main content based on selected page
 if page == "🏠 Home":
     st.markdown('<div class="main-header">🎓 Sahayak AI</div>', unsafe_allow_html=True)
     
-    # Check if monitoring process is still running
-    if st.session_state.monitoring_active and st.session_state.monitoring_process:
-        poll = st.session_state.monitoring_process.poll()
-        if poll is not None:  # Process has ended
-            st.session_state.monitoring_active = False
-            st.session_state.monitoring_process = None
-            st.success("✅ Monitoring session completed!")
-            st.info("📊 Go to 'View Reports' to see the generated report.")
-            st.session_state.monitoring_start_time = None
+    registered_students = _registered_students(dashboard)
+    reports = _all_reports(dashboard)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_students = len(dashboard.get_registered_students())
-        st.metric("📚 Total Registered Students", total_students)
+        st.metric("📚 Total Registered Students", len(registered_students))
     
     with col2:
-        total_reports = len(dashboard.get_all_reports())
-        st.metric("📄 Total Reports", total_reports)
+        st.metric("📄 Total Reports", len(reports))
     
     with col3:
         st.metric("⚙️ Focus Threshold", f"{st.session_state.focus_threshold}%")
@@ -495,28 +784,8 @@ if page == "🏠 Home":
         
         col_end1, col_end2 = st.columns([3, 1])
         with col_end2:
-            if st.button("🛑 End Session", key="home_end"):
-                if st.session_state.monitoring_process:
-                    try:
-                        # Create stop signal file for Windows-compatible shutdown
-                        with open('monitor_stop.signal', 'w') as f:
-                            f.write('stop')
-                        
-                        # Wait a bit for graceful shutdown
-                        time.sleep(3)
-                        
-                        # Then terminate if still running
-                        st.session_state.monitoring_process.terminate()
-                        st.session_state.monitoring_process.wait(timeout=5)
-                    except:
-                        try:
-                            st.session_state.monitoring_process.kill()
-                        except:
-                            pass
-                
-                st.session_state.monitoring_active = False
-                st.session_state.monitoring_process = None
-                st.session_state.monitoring_start_time = None
+            if st.button("🛑 End Session", key="home_end", disabled=st.session_state.stopping):
+                _request_stop()
                 st.rerun()
     else:
         st.info("⚪ No active monitoring session")
@@ -526,7 +795,6 @@ if page == "🏠 Home":
     # Quick Stats from Latest Report
     st.subheader("📊 Latest Session Overview")
     
-    reports = dashboard.get_all_reports()
     if reports:
         latest_report = dashboard.load_report(reports[0])
         
@@ -534,7 +802,7 @@ if page == "🏠 Home":
             col1, col2, col3, col4 = st.columns(4)
             
             students_data = latest_report.get('students', {})
-            total_registered = len(dashboard.get_registered_students())
+            total_registered = len(registered_students)
             students_present = len(students_data)
             
             avg_focus = sum(s['focus_percentage'] for s in students_data.values()) / len(students_data) if students_data else 0
@@ -559,35 +827,9 @@ if page == "🏠 Home":
             # Focus Distribution Chart
             st.subheader("📈 Focus Distribution")
             
-            # Build DataFrame based on whether mobile detection was enabled
-            if latest_report.get('mobile_detection_enabled', False):
-                focus_data = pd.DataFrame([
-                    {
-                        'Student': name,
-                        'Focus %': data['focus_percentage'],
-                        'Mobile Detected': data['mobile_detected']
-                    }
-                    for name, data in students_data.items()
-                ])
-            else:
-                focus_data = pd.DataFrame([
-                    {
-                        'Student': name,
-                        'Focus %': data['focus_percentage']
-                    }
-                    for name, data in students_data.items()
-                ])
-            
-            fig = px.bar(
-                focus_data,
-                x='Student',
-                y='Focus %',
-                color='Focus %',
-                color_continuous_scale=['red', 'yellow', 'green'],
-                title='Student Focus Percentage'
+            fig = _focus_distribution_figure(
+                _data_key(students_data), latest_report.get('threshold', 50), students_data
             )
-            fig.add_hline(y=latest_report.get('threshold', 50), line_dash="dash", 
-                         line_color="red", annotation_text="Threshold")
             st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("📭 No reports available. Start a monitoring session to generate reports.")
@@ -613,7 +855,7 @@ if page == "🏠 Home":
 elif page == "👥 Students":
     st.markdown('<div class="main-header">👥 Registered Students</div>', unsafe_allow_html=True)
     
-    students = dashboard.get_registered_students()
+    students = _registered_students(dashboard)
     
     st.subheader(f"📚 Total Students: {len(students)}")
     
@@ -664,17 +906,7 @@ elif page == "👥 Students":
 elif page == "▶️ Start Monitoring":
     st.markdown('<div class="main-header">▶️ Start Monitoring Session</div>', unsafe_allow_html=True)
     
-    # Check if monitoring process is still running
-    if st.session_state.monitoring_active and st.session_state.monitoring_process:
-        poll = st.session_state.monitoring_process.poll()
-        if poll is not None:  # Process has ended
-            st.session_state.monitoring_active = False
-            st.session_state.monitoring_process = None
-            st.success("✅ Monitoring session completed!")
-            st.info("📊 Go to 'View Reports' to see the generated report.")
-            st.session_state.monitoring_start_time = None
-    
-    students = dashboard.get_registered_students()
+    students = _registered_students(dashboard)
     
     if not students:
         st.error("❌ No students registered! Please add student ZIP files first.")
@@ -747,83 +979,43 @@ elif page == "▶️ Start Monitoring":
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
-        if not st.session_state.monitoring_active:
+        if st.session_state.starting:
+            _start_progress()
+        elif not st.session_state.monitoring_active:
+            if st.session_state.start_error:
+                st.error(f"❌ Error starting monitoring: {st.session_state.start_error}")
+                st.info("You can still run manually: `python student_monitor.py`")
+            
             if st.button("🚀 START MONITORING SESSION", type="primary", use_container_width=True):
-                with st.spinner("🔄 Starting monitoring session..."):
-                    # Clean up any old signal files
-                    for _sig_file in ('monitor_stop.signal', 'camera_ready.signal'):
-                        if os.path.exists(_sig_file):
-                            try:
-                                os.remove(_sig_file)
-                            except:
-                                pass
-                    
-                    # Save config file for student_monitor.py
-                    config = {
-                        'duration': duration_seconds,
-                        'threshold': threshold,
-                        'enable_mobile_detection': enable_mobile
-                    }
-                    
-                    with open('monitor_config.json', 'w') as f:
-                        json.dump(config, f, indent=4)
-                    
-                    # Start monitoring process
-                    try:
-                        import sys
-                        python_executable = sys.executable
-                        session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        st.session_state.session_id = session_id
-                        process = subprocess.Popen(
-                            [python_executable, 'student_monitor.py'],
-                            cwd=os.getcwd(),
-                            creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
-                        )
-                        
-                        # Start audio recorder alongside the monitoring session
+                # Clean up any old signal files
+                for _sig_file in ('monitor_stop.signal', 'camera_ready.signal'):
+                    if os.path.exists(_sig_file):
                         try:
-                            audio_process = subprocess.Popen(
-                                [python_executable, 'audio_recorder.py', '--session-id', session_id],
-                                cwd=os.getcwd(),
-                                creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
-                            )
-                            st.session_state.audio_process = audio_process
-                        except Exception as ae:
-                            st.warning(f"⚠️ Audio recorder could not start: {ae}")
-                            st.session_state.audio_process = None
-                        
-                        st.session_state.monitoring_process = process
-                        st.session_state.monitoring_active = True
-                        st.session_state.monitoring_start_time = datetime.now()
-                        st.session_state.class_duration = duration_seconds
-                        st.session_state.focus_threshold = threshold
-                        
-                        time.sleep(2)  # Give process time to start
-                        
-                        st.success("✅ Monitoring session started successfully!")
-                        audio_status = "🎙️ Audio recording active" if st.session_state.audio_process else "⚠️ Audio recorder not started"
-                        st.info(f"""
-                        **Session Details:**
-                        - Duration: {duration_minutes} minutes ({duration_seconds} seconds)
-                        - Threshold: {threshold}%
-                        - Students: {len(students)}
-                        - Session ID: `{session_id}`
-                        
-                        **A new window has opened for monitoring.**
-                        - The camera will track student focus automatically
-                        - Report will be generated when session ends
-                        - {audio_status} — view transcript in **📝 Notes**
-                        - You can end the session early using the button below
-                        """)
-                        
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error starting monitoring: {e}")
-                        st.info("You can still run manually: `python student_monitor.py`")
+                            os.remove(_sig_file)
+                        except:
+                            pass
+                
+                # Save config file for student_monitor.py
+                config = {
+                    'duration': duration_seconds,
+                    'threshold': threshold,
+                    'enable_mobile_detection': enable_mobile
+                }
+                
+                _write_monitor_config(config)
+                
+                # Start monitoring + audio processes without blocking this rerun
+                session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+                st.session_state.session_id = session_id
+                st.session_state.class_duration = duration_seconds
+                st.session_state.focus_threshold = threshold
+                _start_session_async(session_id)
+                st.rerun()
         else:
             # Monitoring is active
             st.info("📹 **Monitoring Session Active**")
+            if st.session_state.audio_error:
+                st.warning(f"⚠️ Audio recorder could not start: {st.session_state.audio_error}")
             
             if st.session_state.monitoring_start_time:
                 elapsed = (datetime.now() - st.session_state.monitoring_start_time).total_seconds()
@@ -842,67 +1034,9 @@ elif page == "▶️ Start Monitoring":
             
             st.warning("⚠️ A monitoring window is open. Check that window for live tracking.")
             
-            if st.button("🛑 END SESSION NOW", type="secondary", use_container_width=True):
-                with st.spinner("⏳ Ending session and generating report..."):
-                    if st.session_state.monitoring_process:
-                        try:
-                            # Create stop signal file for Windows-compatible shutdown
-                            with open('monitor_stop.signal', 'w') as f:
-                                f.write('stop')
-                            
-                            st.info("⏳ Waiting for report generation...")
-                            
-                            # Wait for graceful shutdown (the script will detect the file)
-                            time.sleep(5)
-                            
-                            # Check if process has ended
-                            poll_result = st.session_state.monitoring_process.poll()
-                            if poll_result is None:
-                                # Still running, send terminate signal
-                                st.session_state.monitoring_process.terminate()
-                                
-                                # Wait up to 10 more seconds
-                                try:
-                                    st.session_state.monitoring_process.wait(timeout=10)
-                                    st.success("✅ Session ended gracefully!")
-                                except subprocess.TimeoutExpired:
-                                    st.warning("⚠️ Process taking too long, forcing shutdown...")
-                                    st.session_state.monitoring_process.kill()
-                                    st.session_state.monitoring_process.wait(timeout=5)
-                                    st.warning("⚠️ Session force-stopped. Report may not be generated.")
-                            else:
-                                st.success("✅ Session ended gracefully!")
-                                
-                        except Exception as e:
-                            st.error(f"❌ Error stopping session: {e}")
-                            try:
-                                st.session_state.monitoring_process.kill()
-                            except:
-                                pass
-                    
-                    # Small delay to ensure report file is written
-                    time.sleep(3)
-                    
-                    # Also stop audio recorder if still running
-                    if st.session_state.audio_process:
-                        try:
-                            if st.session_state.audio_process.poll() is None:
-                                st.session_state.audio_process.terminate()
-                                st.session_state.audio_process.wait(timeout=15)
-                        except Exception:
-                            try:
-                                st.session_state.audio_process.kill()
-                            except Exception:
-                                pass
-                    
-                    st.session_state.monitoring_active = False
-                    st.session_state.monitoring_process = None
-                    st.session_state.audio_process = None
-                    st.session_state.monitoring_start_time = None
-                    
-                    st.success("✅ Session ended!")
-                    st.info("📊 Check 'View Reports' page for the generated report.")
-                    time.sleep(2)
+            if st.button("🛑 END SESSION NOW", type="secondary", use_container_width=True,
+                         disabled=st.session_state.stopping):
+                _request_stop()
                 st.rerun()
 
 elif page == "📈 View Reports":
@@ -917,8 +1051,8 @@ elif page == "📈 View Reports":
         # List all JSON files for debugging
         all_json_files = [f for f in os.listdir(dashboard.reports_dir) if f.endswith('.json')]
         st.write(f"All JSON files found: {len(all_json_files)}")
-        for jf in all_json_files:
-            st.text(f"  - {jf}")
+        if all_json_files:
+            st.markdown("\n".join(f"- `{jf}`" for jf in all_json_files))
         
         # Check if monitoring is still active
         if st.session_state.monitoring_active:
@@ -949,13 +1083,15 @@ elif page == "📈 View Reports":
                 }
             }
             test_filename = f"focus_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(test_filename, 'w') as f:
-                json.dump(test_report, f, indent=4)
+            with open(test_filename, 'wb') as f:
+                f.write(_json_dumps_pretty(test_report))
+            _all_reports.clear()
             st.success(f"✅ Test report created: {test_filename}")
             time.sleep(1)
             st.rerun()
     
-    reports = dashboard.get_all_reports()
+    reports = _all_reports(dashboard)
+    registered_students = _registered_students(dashboard)
     
     if not reports:
         st.warning("📭 No reports available yet.")
@@ -974,9 +1110,7 @@ elif page == "📈 View Reports":
         # Check if there are any JSON files that might be reports
         all_json = [f for f in os.listdir(dashboard.reports_dir) if f.endswith('.json')]
         if all_json:
-            st.write("**Other JSON files found:**")
-            for jf in all_json:
-                st.text(f"  • {jf}")
+            st.markdown("**Other JSON files found:**\n" + "\n".join(f"- `{jf}`" for jf in all_json))
         
         st.stop()
     
@@ -987,6 +1121,8 @@ elif page == "📈 View Reports":
     col_ref1, col_ref2, col_ref3 = st.columns([4, 1, 1])
     with col_ref2:
         if st.button("🔄 Refresh List", use_container_width=True):
+            _all_reports.clear()
+            _registered_students.clear()
             st.rerun()
     with col_ref3:
         # Auto-refresh toggle
@@ -994,19 +1130,17 @@ elif page == "📈 View Reports":
     
     if auto_refresh:
         time.sleep(5)
+        _all_reports.clear()
         st.rerun()
     
     report_options = {}
     for report in reports:
+        report_path = os.path.join(dashboard.reports_dir, report)
         try:
-            data = dashboard.load_report(report)
-            if data:
-                timestamp = data.get('timestamp', report)
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                formatted = dt.strftime("%B %d, %Y at %I:%M %p")
-                report_options[f"{formatted} ({report})"] = report
-        except:
-            report_options[report] = report
+            mtime = os.path.getmtime(report_path)
+        except OSError:
+            continue
+        report_options[_report_label(report_path, mtime)] = report
     
     selected_display = st.selectbox("Choose a report:", list(report_options.keys()))
     selected_report = report_options[selected_display]
@@ -1028,179 +1162,14 @@ elif page == "📈 View Reports":
     with col3:
         if st.button("🗑️ Delete Report", type="secondary", use_container_width=True):
             if dashboard.delete_report(selected_report):
+                _all_reports.clear()
                 st.success("✅ Report deleted successfully!")
                 time.sleep(1)
                 st.rerun()
     
     st.markdown("---")
     
-    # Report Summary
-    students_data = report_data.get('students', {})
-    threshold = report_data.get('threshold', 50)
-    duration = report_data.get('duration', 0)
-    
-    # Key Metrics
-    st.subheader("📊 Session Summary")
-    
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    total_registered = len(dashboard.get_registered_students())
-    students_present = len(students_data)
-    attendance_rate = (students_present / total_registered * 100) if total_registered > 0 else 0
-    
-    avg_focus = sum(s['focus_percentage'] for s in students_data.values()) / len(students_data) if students_data else 0
-    students_above = sum(1 for s in students_data.values() if s['focus_percentage'] >= threshold)
-    students_below = len(students_data) - students_above
-    
-    mobile_enabled = report_data.get('mobile_detection_enabled', False)
-    total_mobile = sum(s['mobile_detected'] for s in students_data.values()) if mobile_enabled else 0
-    
-    with col1:
-        st.metric("⏱️ Duration", f"{duration // 60} min")
-    
-    with col2:
-        st.metric("👥 Attendance", f"{students_present}/{total_registered}", 
-                 delta=f"{attendance_rate:.0f}%")
-    
-    with col3:
-        st.metric("📊 Avg Focus", f"{avg_focus:.1f}%",
-                 delta="Good" if avg_focus >= threshold else "Low")
-    
-    with col4:
-        st.metric("✅ Passed", students_above, 
-                 delta=f"{(students_above/max(1,students_present)*100):.0f}%")
-    
-    with col5:
-        if mobile_enabled:
-            st.metric("📱 Mobile Use", total_mobile,
-                     delta="None" if total_mobile == 0 else "Detected", delta_color="inverse")
-        else:
-            st.metric("📱 Mobile Detection", "Disabled")
-    
-    # Detailed Statistics
-    st.markdown("---")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("📈 Focus Performance")
-        
-        # Focus distribution pie chart
-        pass_fail = pd.DataFrame({
-            'Category': ['Above Threshold', 'Below Threshold'],
-            'Count': [students_above, students_below]
-        })
-        
-        fig = px.pie(pass_fail, values='Count', names='Category',
-                    color='Category',
-                    color_discrete_map={'Above Threshold': 'green', 'Below Threshold': 'red'},
-                    title=f'Students vs {threshold}% Threshold')
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.subheader("👥 Attendance Overview")
-        
-        # Attendance pie chart
-        attendance_data = pd.DataFrame({
-            'Status': ['Present', 'Absent'],
-            'Count': [students_present, total_registered - students_present]
-        })
-        
-        fig = px.pie(attendance_data, values='Count', names='Status',
-                    color='Status',
-                    color_discrete_map={'Present': 'lightblue', 'Absent': 'lightgray'},
-                    title='Attendance Distribution')
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # Student-wise Details
-    st.markdown("---")
-    st.subheader("👤 Individual Student Performance")
-    
-    # Create DataFrame
-    if mobile_enabled:
-        student_df = pd.DataFrame([
-            {
-                'Student': name,
-                'Focus %': f"{data['focus_percentage']:.1f}%",
-                'Focused': data['focused_count'],
-                'Unfocused': data['unfocused_count'],
-                'Total Checks': data['total_checks'],
-                'Mobile Detected': data['mobile_detected'],
-                'Status': '✅ Pass' if data['focus_percentage'] >= threshold else '❌ Fail'
-            }
-            for name, data in students_data.items()
-        ])
-    else:
-        student_df = pd.DataFrame([
-            {
-                'Student': name,
-                'Focus %': f"{data['focus_percentage']:.1f}%",
-                'Focused': data['focused_count'],
-                'Unfocused': data['unfocused_count'],
-                'Total Checks': data['total_checks'],
-                'Status': '✅ Pass' if data['focus_percentage'] >= threshold else '❌ Fail'
-            }
-            for name, data in students_data.items()
-        ])
-    
-    # Sort by focus percentage
-    student_df = student_df.sort_values('Focus %', ascending=False)
-    
-    st.dataframe(student_df, use_container_width=True, hide_index=True)
-    
-    # Focus Bar Chart
-    st.subheader("📊 Focus Comparison")
-    
-    focus_chart_data = pd.DataFrame([
-        {
-            'Student': name,
-            'Focus Percentage': data['focus_percentage']
-        }
-        for name, data in students_data.items()
-    ]).sort_values('Focus Percentage', ascending=False)
-    
-    fig = px.bar(
-        focus_chart_data,
-        x='Student',
-        y='Focus Percentage',
-        color='Focus Percentage',
-        color_continuous_scale=['red', 'yellow', 'green'],
-        title='Student Focus Percentage Comparison'
-    )
-    fig.add_hline(y=threshold, line_dash="dash", line_color="red", 
-                 annotation_text=f"Threshold ({threshold}%)")
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # Mobile Phone Usage (only show if feature was enabled)
-    if report_data.get('mobile_detection_enabled', False):
-        if total_mobile > 0:
-            st.markdown("---")
-            st.subheader("📱 Mobile Phone Detections")
-            
-            mobile_students = [(name, data) for name, data in students_data.items() 
-                              if data['mobile_detected'] > 0]
-            
-            for student_name, data in mobile_students:
-                with st.expander(f"⚠️ {student_name} - {data['mobile_detected']} detections"):
-                    st.warning(f"**{student_name} REPORT!**")
-                    st.write(f"Total mobile detections: {data['mobile_detected']}")
-                    st.write("Detection times:")
-                    for time_str in data.get('mobile_times', []):
-                        st.text(f"  • {time_str}")
-    
-    # Absent Students
-    all_students = set(dashboard.get_registered_students())
-    present_students = set(students_data.keys())
-    absent_students = all_students - present_students
-    
-    if absent_students:
-        st.markdown("---")
-        st.subheader("🚫 Absent Students")
-        
-        absent_cols = st.columns(min(5, len(absent_students)))
-        for i, student in enumerate(sorted(absent_students)):
-            with absent_cols[i % len(absent_cols)]:
-                st.error(f"❌ {student}")
+    _render_report(report_data, registered_students)
 
 # ─────────────────────────────────────────────────────────────────────────────
 elif page == "📝 Notes":
@@ -1208,10 +1177,7 @@ elif page == "📝 Notes":
     st.caption("Audio transcriptions captured by Whisper base model during live sessions.")
 
     # ── Collect all notes files ───────────────────────────────────────────────
-    notes_files = sorted(
-        [f for f in os.listdir(".") if f.startswith("class_notes_") and f.endswith(".json")],
-        reverse=True,
-    )
+    notes_files = sorted((p.name for p in Path(".").glob("class_notes_*.json")), reverse=True)
 
     if not notes_files:
         st.warning("📭 No class notes found yet.")
@@ -1362,8 +1328,7 @@ elif page == "📝 Notes":
                                 # Persist into the JSON file so it survives page reloads
                                 notes_data["star_notes"] = star_data
                                 notes_data["star_transcript"] = full_transcript
-                                with open(selected_notes_file, "w", encoding="utf-8") as f:
-                                    json.dump(notes_data, f, indent=4, ensure_ascii=False)
+                                write_notes_json(selected_notes_file, notes_data)
                                 st.session_state[star_cache_key] = star_data
                                 st.session_state[star_transcript_key] = full_transcript
                                 st.rerun()
@@ -1448,7 +1413,7 @@ elif page == "⚙️ Settings":
         `{dashboard.student_photos_path}`
         
         **Total Students:**
-        {len(dashboard.get_registered_students())}
+        {len(_registered_students(dashboard))}
         """)
     
     with col2:
@@ -1457,29 +1422,13 @@ elif page == "⚙️ Settings":
         `{dashboard.reports_dir}`
         
         **Total Reports:**
-        {len(dashboard.get_all_reports())}
+        {len(_all_reports(dashboard))}
         """)
     
     st.markdown("---")
     
     # Report Management
-    st.subheader("🗂️ Report Management")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if st.button("🗑️ Delete All Reports", type="secondary"):
-            confirm = st.checkbox("⚠️ Confirm deletion of all reports")
-            if confirm:
-                reports = dashboard.get_all_reports()
-                for report in reports:
-                    dashboard.delete_report(report)
-                st.success(f"✅ Deleted {len(reports)} reports")
-                st.rerun()
-    
-    with col2:
-        if st.button("📥 Export All Reports"):
-            st.info("📦 Export functionality - Coming soon!")
+    _report_management()
     
     st.markdown("---")
     
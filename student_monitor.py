@@ -4,9 +4,21 @@ Detects faces, monitors focus, and identifies mobile phone usage
 Uses face_recognition library for accurate ML-based face detection
 """
 
+import os
+
+# Capture, frame processing, mobile detection and transcription all run native code
+# at once; give each library's thread pool half the cores (at least two) rather than
+# all of them, so the pools don't oversubscribe the CPU. Must be set before
+# cv2/numpy/torch load. Explicit environment settings win.
+_CPU_COUNT = os.cpu_count() or 1
+NATIVE_THREADS = min(_CPU_COUNT, max(2, _CPU_COUNT // 2))
+_OMP_THREADS_FROM_USER = 'OMP_NUM_THREADS' in os.environ
+for _var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS'):
+    os.environ.setdefault(_var, str(NATIVE_THREADS))
+
 import cv2
 import numpy as np
-import os
+import io
 import zipfile
 import time
 import queue
@@ -14,21 +26,47 @@ import threading
 from datetime import datetime
 from pathlib import Path
 import json
+import hashlib
 import shutil
 import sys
 import warnings
 import signal
 import atexit
+import traceback
+import itertools
+from operator import itemgetter
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+cv2.setNumThreads(NATIVE_THREADS)
+
+# Spawned training workers (Windows) re-import this script as __mp_main__ before
+# running training_images.encode_image; they skip the heavy optional imports below
+_SPAWNED_WORKER = __name__ == '__mp_main__'
 
 # ── Whisper speech-to-text ──────────────────────────────────────────────────
 WHISPER_AVAILABLE = False
 _whisper_lib = None
 try:
+    if _SPAWNED_WORKER:
+        raise ImportError
     import whisper as _whisper_lib
     WHISPER_AVAILABLE = True
 except ImportError:
     pass
 
+# faster-whisper (CTranslate2, int8/fp16 kernels) is preferred over openai-whisper when installed
+FASTER_WHISPER_AVAILABLE = False
+try:
+    if _SPAWNED_WORKER:
+        raise ImportError
+    from faster_whisper import WhisperModel as _FasterWhisperModel
+    import ctranslate2 as _ct2
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    pass
+
 _AUDIO_AVAILABLE = False
 try:
     import sounddevice as _sd
@@ -36,12 +74,41 @@ try:
 except ImportError:
     pass
 
+# waitKey(1) costs ~15 ms on Windows, so the console keyboard is polled there instead
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    msvcrt = None
+
+# orjson encodes reports in one native pass (numpy scalars included); stdlib json is the fallback
+try:
+    import orjson
+
+    def _write_report_json(f, report):
+        """Write report as JSON to the binary file f"""
+        f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+except ImportError:
+    # Reports are plain trees of dicts/lists, so the per-container cycle check is wasted work
+    _REPORT_ENCODER = json.JSONEncoder(indent=2, check_circular=False)
+
+    def _write_report_json(f, report):
+        """Write report as JSON to the binary file f"""
+        # Stream the encoder's chunks through the file buffer rather than joining the
+        # whole document into one string first; long sessions carry big mobile_times lists
+        text = io.TextIOWrapper(f, encoding='utf-8')
+        text.writelines(_REPORT_ENCODER.iterencode(report))
+        text.flush()
+        text.detach()
+
+
 # Suppress all warnings during face_recognition import
 warnings.filterwarnings('ignore')
 
-# Try to import face_recognition for ML-based recognition
+# face_recognition for ML-based recognition is imported lazily by
+# _init_face_recognition(), so importing this module stays cheap
 FACE_RECOGNITION_AVAILABLE = False
 face_recognition = None
+_face_recognition_checked = False
 
 # Redirect stdout/stderr to suppress error messages
 class SuppressOutput:
@@ -58,37 +125,65 @@ class SuppressOutput:
         sys.stdout = self._original_stdout
         sys.stderr = self._original_stderr
 
+def _init_face_recognition():
+    """Import and smoke-test face_recognition on first use; returns FACE_RECOGNITION_AVAILABLE"""
+    global face_recognition, FACE_RECOGNITION_AVAILABLE, _face_recognition_checked
+    if _face_recognition_checked:
+        return FACE_RECOGNITION_AVAILABLE
+    _face_recognition_checked = True
+    try:
+        with SuppressOutput():
+            import face_recognition as _face_recognition
+            # Test if it actually works
+            test_array = np.zeros((100, 100, 3), dtype=np.uint8)
+            _ = _face_recognition.face_locations(test_array)
+        
+        face_recognition = _face_recognition
+        FACE_RECOGNITION_AVAILABLE = True
+        print("✓ Using ML-based face recognition (face_recognition library)")
+    except:
+        FACE_RECOGNITION_AVAILABLE = False
+        face_recognition = None
+        print("⚠ Using OpenCV recognition mode (face_recognition not available)")
+        print("  This is OK - the system will still work!")
+        print("  OpenCV mode uses histogram matching for face recognition.")
+    return FACE_RECOGNITION_AVAILABLE
+
+# Photo reading/decoding lives in its own light module so spawned training workers
+# never import torch or whisper through this one
+from training_images import IMAGE_EXTENSIONS, open_image_source, image_label, decode_image, encode_image
+from notes_json import write_notes_json
+
+# Pillow decodes training photos and feeds MTCNN; imported once here, not per call
 try:
-    with SuppressOutput():
-        import face_recognition
-        # Test if it actually works
-        test_array = np.zeros((100, 100, 3), dtype=np.uint8)
-        _ = face_recognition.face_locations(test_array)
-    
-    FACE_RECOGNITION_AVAILABLE = True
-    print("✓ Using ML-based face recognition (face_recognition library)")
-except:
-    FACE_RECOGNITION_AVAILABLE = False
-    face_recognition = None
-    print("⚠ Using OpenCV recognition mode (face_recognition not available)")
-    print("  This is OK - the system will still work!")
-    print("  OpenCV mode uses histogram matching for face recognition.")
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
 
 # ── GPU face recognition via facenet-pytorch (primary) ─────────────────────
 CUDA_AVAILABLE = False
 FACE_RECOGNITION_MODEL = "hog"
 FACENET_AVAILABLE = False
 FACENET_DEVICE = None
+torch = None
 
 try:
+    if _SPAWNED_WORKER:
+        raise ImportError
     import torch
+    # Let residual FP32 matmuls use TF32 tensor cores
+    torch.set_float32_matmul_precision('high')
     from facenet_pytorch import MTCNN, InceptionResnetV1
     FACENET_DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     CUDA_AVAILABLE = (FACENET_DEVICE.type == 'cuda')
+    # With facenet on the GPU torch's CPU pool only does glue work; on CPU-only
+    # machines it runs the whole encoder, so it gets every core back (torch sized
+    # its pool from the OMP_NUM_THREADS share set above)
+    if not CUDA_AVAILABLE and not _OMP_THREADS_FROM_USER:
+        torch.set_num_threads(_CPU_COUNT)
     FACENET_AVAILABLE = True
     if CUDA_AVAILABLE:
         print(f"✓ GPU detected: {torch.cuda.get_device_name(0)} — face training & recognition on GPU")
-        FACE_RECOGNITION_MODEL = "cnn"
     else:
         print("  facenet-pytorch loaded (CPU) — no CUDA GPU found")
 except Exception as _fe:
@@ -98,12 +193,144 @@ except Exception as _fe:
     try:
         import dlib
         CUDA_AVAILABLE = dlib.DLIB_USE_CUDA
-        FACE_RECOGNITION_MODEL = "cnn" if CUDA_AVAILABLE else "hog"
         if CUDA_AVAILABLE:
             print("✓ GPU (dlib CUDA) — using CNN face model")
     except Exception:
         pass
 
+# dlib's CNN (MMOD) face detector is only fast when dlib itself was built with
+# CUDA; a CUDA-enabled torch says nothing about that, so probe dlib directly
+DLIB_USE_CUDA = False
+try:
+    import dlib
+    DLIB_USE_CUDA = bool(dlib.DLIB_USE_CUDA)
+except Exception:
+    pass
+FACE_RECOGNITION_MODEL = "cnn" if DLIB_USE_CUDA else "hog"
+
+# ── Optional numba kernel for the OpenCV histogram matcher ─────────────────
+NUMBA_AVAILABLE = False
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    pass
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _chi_square_argmin(known, query):
+        """Row of known closest to query under cv2's HISTCMP_CHISQR; returns (index, score)"""
+        scores = np.empty(known.shape[0], dtype=np.float64)
+        for i in prange(known.shape[0]):
+            total = 0.0
+            for j in range(known.shape[1]):
+                q = query[j]
+                if q > 2.220446049250313e-16:  # DBL_EPSILON, as in compareHist
+                    d = q - known[i, j]
+                    total += d * d / q
+            scores[i] = total
+        best = np.argmin(scores)
+        return best, scores[best]
+else:
+    def _chi_square_argmin(known, query):
+        """Row of known closest to query under cv2's HISTCMP_CHISQR; returns (index, score)"""
+        # sum over bins where query > 0 of (query - known)^2 / query, for every row at once
+        nonzero = query > np.finfo(np.float64).eps
+        q = query[nonzero]
+        diff = known[:, nonzero] - q
+        scores = (diff * diff / q).sum(axis=1)
+        best = int(scores.argmin())
+        return best, scores[best]
+
+
+def _normalize_audio(audio):
+    """Peak-normalize a chunk to [-1, 1] as mono float32, in place when it already is float32"""
+    audio = audio.astype(np.float32, copy=False)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1, dtype=np.float32)
+    if audio.size:
+        peak = max(-float(audio.min()), float(audio.max()))
+        if peak > 0:
+            np.divide(audio, peak, out=audio)
+    return audio
+
+
+def _prefetch_images(paths, workers=min(8, os.cpu_count() or 1), depth=16):
+    """Yield decoded RGB images for paths in order, decoding up to depth images ahead on threads"""
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(decode_image, p) for p in itertools.islice(paths, depth))
+        while pending:
+            image = pending.popleft().result()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append(pool.submit(decode_image, next_path))
+            yield image
+
+
+TRAINING_CACHE_FILE = "encodings.cache.npz"
+
+# 1 MiB write buffer so multi-MB reports flush in a few syscalls instead of one per 8 KiB
+REPORT_WRITE_BUFFER = 1 << 20
+
+# Per-student counters copied into reports, fetched in one C-level call
+_report_fields = itemgetter(
+    'focused_count', 'unfocused_count', 'total_checks', 'mobile_detected', 'mobile_times', 'alerts'
+)
+
+# Preview window width; larger frames are shrunk for display only, inference keeps full size
+DISPLAY_MAX_WIDTH = 960
+
+# Seconds without a new camera frame (reader thread still alive) before the session gives up
+FRAME_STALL_TIMEOUT = 30.0
+
+
+# dlib encodings are quantized as round(x * scale) in int16 for the matching prefilter;
+# below this many enrolled rows a straight float scan is already cheaper
+ENCODING_QUANT_SCALE = 64
+ENCODING_PREFILTER_MIN_ROWS = 256
+
+
+def _quantize_encodings(encodings):
+    """Round encodings to ENCODING_QUANT_SCALE steps; int16 so differences never overflow"""
+    return np.rint(encodings * ENCODING_QUANT_SCALE).astype(np.int16)
+
+
+def _flush_to_disk(f):
+    """Flush f and fsync it, so a following os.replace can never publish a file whose data isn't on disk"""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _frame_buffer(buf, shape):
+    """buf if it already has this shape, else a new uint8 array to use as an OpenCV dst"""
+    if buf is not None and buf.shape == shape:
+        return buf
+    return np.empty(shape, dtype=np.uint8)
+
+
+@lru_cache(maxsize=1024)
+def _text_size(text, scale, thickness):
+    """cv2.getTextSize for a HERSHEY_SIMPLEX label; overlay labels repeat, so each is measured once"""
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)[0]
+
+# facenet match threshold: L2 distance < 0.75 between unit vectors (same person; family ~0.85+),
+# i.e. cosine similarity > 1 - 0.75**2 / 2
+FACENET_COS_THRESHOLD = 1 - 0.75 ** 2 / 2
+
+# MTCNN finds faces on a copy whose long edge is at most this; crops still come from the full frame
+FACE_DETECT_MAX_SIDE = 640
+
+# Faces per pinned upload buffer for the facenet encoder; larger batches take the plain copy
+FACE_STAGE_SIZE = 64
+
+# Upper bound on process-pool workers for parallel dlib training
+TRAINING_WORKERS = 8
+
+# Seconds between JSON Lines checkpoints of student stats during a session
+CHECKPOINT_INTERVAL = 60
+
+
 class StudentMonitor:
     def __init__(self, student_photos_path=".", check_interval=60, focus_threshold=50, enable_mobile_detection=False):
         """
@@ -115,26 +342,81 @@ class StudentMonitor:
             focus_threshold: Minimum focus percentage (default: 50%)
             enable_mobile_detection: Enable mobile detection (default: False)
         """
+        _init_face_recognition()
         self.student_photos_path = student_photos_path
         self.check_interval = check_interval
         self.focus_threshold = focus_threshold
         self.student_data = {}
-        self.known_faces = {}
+        self.registered_students = None  # zip names, known only in directory mode
+        self.known_faces = {}          # OpenCV fallback: normalized colour histograms per student
+        self._hist_matrix = None       # (K, 512) float32 stack of known_faces histograms
+        self._hist_labels = None
         self.known_face_encodings = {}
+        self._enc_matrix = None        # (N, 128) float32 stack of known_face_encodings
+        self._enc_quant = None         # _enc_matrix quantized for the L-inf prefilter (large N only)
+        self._enc_labels = None        # student name for each row of _enc_matrix
         self.facenet_embeddings = {}   # GPU embeddings keyed by student name
+        self._emb_matrix = None        # (M, 512) float32 stack of facenet_embeddings, unit rows
+        self._emb_labels = None        # student name for each row of _emb_matrix
         self.face_cascade = None
         self.eye_cascade = None
+        self._eye_cuda = None          # cv2.cuda eye cascade when OpenCV is built with CUDA
+        self._gpu_gray = None          # device copy of the current gray frame for _eye_cuda
+        self._gpu_gray_pending = None  # host gray frame not yet uploaded to _gpu_gray
+        self.face_net = None           # OpenCV DNN ResNet-SSD face detector (optional)
+        self.face_yunet = None         # OpenCV YuNet INT8 face detector (optional, preferred)
+        self._yunet_size = None        # input size YuNet is currently set up for
+        self._use_opencl = False       # run whole-frame OpenCV ops through the T-API (UMat)
         self.mtcnn = None              # facenet-pytorch face detector
         self.resnet = None             # facenet-pytorch encoder (GPU)
+        self._resnet_dtype = None      # torch.float16 on CUDA, torch.float32 otherwise
+        self._face_stage = None        # pinned host buffer for async face uploads (CUDA only)
         self.start_time = None
         self.should_stop = False
         self._report_generated = False
+        self._last_report_path = None
         self.enable_mobile_detection = enable_mobile_detection
         self.mobile_detection_boxes = []
+        self._last_mobile_submit = 0.0  # mobile detection shares the focus sampling cadence
+        self._mobile_result = (False, [])  # (detected, boxes) from the detector thread
+        self._mobile_queue = None
+        self._mobile_thread = None
+        # Camera reader thread: newest frame and its sequence number, guarded by _frame_cond
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None
+        self._frame_seq = 0
+        self._capture_failed = False
+        self._frame_wanted = threading.Event()  # set while the loop waits for a decoded frame
+        self._capture_stop = None
+        self._capture_thread = None
+        # JSON Lines checkpoint: appended periodically, removed once the final report is saved
+        self._checkpoint_path = None
+        self._checkpointed_checks = {}
+        self._last_checkpoint = 0.0
+        # Motion gating: skip recognition on frames that barely differ from the last one
+        self._prev_small_gray = None
+        self._rgb_buf = None           # reused BGR→RGB output for process_frame
+        self._timer_sec = -1           # elapsed second _timer_text was formatted for
+        self._timer_text = ""
+        self._detect_rgb_buf = None    # reused downscaled RGB copy the face detectors run on
+        self._last_annotations = []
+        self._face_trackers = []       # MOSSE tracker per entry of _last_annotations (None if unavailable)
+        self._motion_skips = 0
+        self._max_motion_skips = 10
+        # Focus sampling: at most one recognition pass per _sample_interval seconds
+        self._sample_interval = 0.2
+        self._last_sample = 0.0
         self.stop_file = "monitor_stop.signal"
+        self._report_dir = os.getcwd()  # reports are written here; resolved once
+        self._last_stop_check = 0.0
+        self._stop_check_interval = 0.5  # seconds between stop-file stat() calls
         self.yolo_model = None
+        self._yolo_net = None          # YOLOv8l ONNX through cv2.dnn (used instead of yolo_model)
+        self._yolo_half = False        # FP16 inference for the PyTorch weights on CUDA
         # Whisper / audio transcription
         self.whisper_model = None
+        self._whisper_backend = None   # "faster" (faster-whisper) or "openai" (openai-whisper)
+        self._whisper_fp16 = False
         self._audio_stop_event = None
         self._audio_thread = None
         self._whisper_session_id = None
@@ -148,7 +430,6 @@ class StudentMonitor:
         
         # Initialize detection models
         self._load_cascades()
-        self._load_yolov8()
         self._load_facenet()  # GPU face recognition model
         
         # Load and train on student photos from zip files
@@ -156,27 +437,66 @@ class StudentMonitor:
         print("TRAINING FACE RECOGNITION MODEL")
         print("="*70)
         self._load_student_photos()
+        self._build_embedding_matrix()
+        self._build_encoding_matrix()
+        self._build_histogram_matrix()
+        
+        # Return training's cached MTCNN/ResNet activations to the driver before
+        # YOLO (only loaded when mobile detection is enabled) claims its VRAM
+        if CUDA_AVAILABLE:
+            torch.cuda.empty_cache()
+        self._load_yolov8()
     
     # ── Whisper helpers ────────────────────────────────────────────────────
     def _load_whisper(self):
         """Load Whisper base model on GPU right when the camera opens."""
-        if not WHISPER_AVAILABLE:
+        if not (WHISPER_AVAILABLE or FASTER_WHISPER_AVAILABLE):
             print("⚠ Whisper not available — pip install openai-whisper sounddevice")
             return
         if not _AUDIO_AVAILABLE:
             print("⚠ sounddevice not available — pip install sounddevice")
             return
+        if FASTER_WHISPER_AVAILABLE:
+            try:
+                on_gpu = _ct2.get_cuda_device_count() > 0
+                device, compute_type = ("cuda", "int8_float16") if on_gpu else ("cpu", "int8")
+                print(f"⏳ Loading faster-whisper base model on {device.upper()} ({compute_type})...")
+                self.whisper_model = _FasterWhisperModel("base", device=device, compute_type=compute_type)
+                self._whisper_backend = "faster"
+                print(f"✓ faster-whisper base model loaded on {device.upper()}")
+                return
+            except Exception as e:
+                print(f"⚠ faster-whisper load failed ({e}), trying openai-whisper")
+                self.whisper_model = None
+        if not WHISPER_AVAILABLE:
+            return
         try:
             import torch
             device = "cuda" if torch.cuda.is_available() else "cpu"
             gpu_label = f"GPU ({torch.cuda.get_device_name(0)})" if device == "cuda" else "CPU"
             print(f"⏳ Loading Whisper base model on {gpu_label}...")
             self.whisper_model = _whisper_lib.load_model("base", device=device)
+            self._whisper_backend = "openai"
+            self._whisper_fp16 = device == "cuda"
             print(f"✓ Whisper base model loaded on {gpu_label}")
         except Exception as e:
             print(f"⚠ Whisper load failed: {e}")
             self.whisper_model = None
 
+    def _transcribe(self, audio):
+        """Transcribe a mono float32 16 kHz clip with whichever Whisper backend was loaded"""
+        if self._whisper_backend == "faster":
+            segments, _ = self.whisper_model.transcribe(
+                audio, language="en", beam_size=1, vad_filter=True
+            )
+            return " ".join(seg.text.strip() for seg in segments).strip()
+        if self._whisper_fp16:
+            # On CUDA, hand over a device tensor: openai-whisper then computes the
+            # log-mel STFT with torch on the GPU instead of on the CPU plus an upload
+            audio = torch.from_numpy(audio).to(self.whisper_model.device, non_blocking=True)
+        result = self.whisper_model.transcribe(audio, language="en", fp16=self._whisper_fp16)
+        return result.get("text", "").strip()
+
     def _run_audio_transcription(self, session_id: str):
         """
         Background thread: records audio in 30-second chunks and
@@ -193,19 +513,41 @@ class StudentMonitor:
         stop_ev = self._audio_stop_event
 
         def _recording_loop():
+            # The InputStream callback writes into a ring buffer two chunks long;
+            # this loop cuts completed 30 s windows out of it as soon as they fill
             chunk_samples = int(CHUNK_SECONDS * SAMPLE_RATE)
+            ring = np.zeros(2 * chunk_samples, dtype=np.float32)
+            written = [0]   # total samples written by the callback
+            emitted = 0     # total samples handed to Whisper
+
+            def _on_audio(indata, frames, time_info, status):
+                pos = written[0] % len(ring)
+                head = min(frames, len(ring) - pos)
+                ring[pos:pos + head] = indata[:head, 0]
+                ring[:frames - head] = indata[head:, 0]
+                written[0] += frames
+
+            def _window(start, length):
+                start %= len(ring)
+                end = start + length
+                if end <= len(ring):
+                    return ring[start:end].copy()
+                return np.concatenate((ring[start:], ring[:end - len(ring)]))
+
             while not stop_ev.is_set():
                 try:
-                    chunk = _sd.rec(chunk_samples, samplerate=SAMPLE_RATE,
-                                    channels=1, dtype="float32")
-                    for _ in range(CHUNK_SECONDS):
-                        if stop_ev.is_set():
-                            _sd.stop()
-                            break
-                        time.sleep(1)
-                    else:
-                        _sd.wait()
-                    audio_q.put(chunk.copy())
+                    with _sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype="float32",
+                                         blocksize=SAMPLE_RATE // 10, callback=_on_audio):
+                        while not stop_ev.is_set():
+                            if written[0] - emitted >= chunk_samples:
+                                audio_q.put(_window(emitted, chunk_samples))
+                                emitted += chunk_samples
+                            else:
+                                stop_ev.wait(0.1)
+                    # Hand over whatever was recorded after the last full chunk
+                    if written[0] > emitted:
+                        audio_q.put(_window(emitted, written[0] - emitted))
+                        emitted = written[0]
                 except Exception as rec_err:
                     print(f"  [Audio] Recording error: {rec_err}")
                     time.sleep(1)
@@ -223,14 +565,7 @@ class StudentMonitor:
                 elapsed = time.time() - session_start
                 t_label = f"{int(elapsed)//60}:{int(elapsed)%60:02d}"
                 try:
-                    af = audio_chunk.astype(np.float32)
-                    if af.ndim > 1:
-                        af = af.mean(axis=1)
-                    mx = np.abs(af).max()
-                    if mx > 0:
-                        af = af / mx
-                    result = self.whisper_model.transcribe(af, language="en", fp16=False)
-                    text = result.get("text", "").strip()
+                    text = self._transcribe(_normalize_audio(audio_chunk))
                 except Exception as tr_err:
                     print(f"  [Whisper] Transcription error: {tr_err}")
                     text = ""
@@ -242,14 +577,7 @@ class StudentMonitor:
                 while not audio_q.empty():
                     try:
                         extra = audio_q.get_nowait()
-                        af = extra.astype(np.float32)
-                        if af.ndim > 1:
-                            af = af.mean(axis=1)
-                        mx = np.abs(af).max()
-                        if mx > 0:
-                            af = af / mx
-                        res2 = self.whisper_model.transcribe(af, language="en", fp16=False)
-                        t2 = res2.get("text", "").strip()
+                        t2 = self._transcribe(_normalize_audio(extra))
                         if t2:
                             segments.append({"time": t_label, "text": t2})
                             full_parts.append(t2)
@@ -263,10 +591,7 @@ class StudentMonitor:
                 "segments": segments,
                 "full_transcript": " ".join(full_parts),
             }
-            tmp = notes_file + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            os.replace(tmp, notes_file)
+            write_notes_json(notes_file, data)
             print(f"✅ Transcript saved → {notes_file} ({len(segments)} segments)")
 
     def _load_facenet(self):
@@ -274,7 +599,6 @@ class StudentMonitor:
         if not FACENET_AVAILABLE:
             return
         try:
-            from facenet_pytorch import MTCNN, InceptionResnetV1
             # MTCNN: detects & aligns faces to 160×160 before encoding
             self.mtcnn = MTCNN(
                 image_size=160,
@@ -285,6 +609,15 @@ class StudentMonitor:
             )
             # InceptionResnetV1 pretrained on VGGFace2 (very good for ID)
             self.resnet = InceptionResnetV1(pretrained='vggface2').eval().to(FACENET_DEVICE)
+            # fp16 + channels_last is the tensor-core friendly layout for cuDNN convs
+            self._resnet_dtype = torch.float16 if CUDA_AVAILABLE else torch.float32
+            self.resnet = self.resnet.to(dtype=self._resnet_dtype, memory_format=torch.channels_last)
+            if CUDA_AVAILABLE:
+                # The input is always 160x160, so let cuDNN pick the fastest conv algorithms
+                torch.backends.cudnn.benchmark = True
+                self._face_stage = torch.empty(FACE_STAGE_SIZE, 3, 160, 160,
+                                               dtype=self._resnet_dtype, pin_memory=True)
+            self._compile_resnet()
             device_label = f"GPU ({FACENET_DEVICE})" if CUDA_AVAILABLE else "CPU"
             print(f"✓ facenet-pytorch loaded on {device_label}")
         except Exception as e:
@@ -292,6 +625,27 @@ class StudentMonitor:
             self.mtcnn = None
             self.resnet = None
 
+    def _compile_resnet(self):
+        """
+        Compile the encoder with torch.compile (fused kernels). Batch sizes vary with
+        the number of faces in view, so the batch dimension is compiled dynamic and
+        CUDA graphs (which record one graph per shape) are not used. Compilation is
+        lazy: warm-up passes at batch 1 (specialized by torch) and batch 2 (the
+        dynamic graph) run here, and any failure (no Triton, e.g. on Windows) keeps
+        the eager model.
+        """
+        if not CUDA_AVAILABLE or sys.platform == 'win32' or not hasattr(torch, 'compile'):
+            return
+        eager = self.resnet
+        try:
+            self.resnet = torch.compile(eager, dynamic=True)
+            for batch in (1, 2):
+                self._resnet_embed(torch.zeros(batch, 3, 160, 160, device=FACENET_DEVICE))
+            print("✓ facenet encoder compiled (torch.compile)")
+        except Exception as e:
+            print(f"  torch.compile unavailable for facenet ({e}), using eager model")
+            self.resnet = eager
+
     def _load_cascades(self):
         """Load OpenCV cascade classifiers"""
         try:
@@ -308,21 +662,163 @@ class StudentMonitor:
             print("✓ Successfully loaded detection models")
         except Exception as e:
             print(f"Error loading cascades: {e}")
+        self._load_eye_cascade_cuda()
+        # OpenCL (e.g. an otherwise idle integrated GPU) for the whole-frame operations
+        try:
+            if cv2.ocl.haveOpenCL():
+                cv2.ocl.setUseOpenCL(True)
+                self._use_opencl = cv2.ocl.useOpenCL()
+                if self._use_opencl:
+                    print("✓ OpenCV T-API enabled (OpenCL)")
+        except Exception:
+            self._use_opencl = False
+        self._load_face_yunet()
+        if self.face_yunet is None:
+            self._load_face_ssd()
+    
+    def _load_eye_cascade_cuda(self):
+        """
+        Load the eye cascade for cv2.cuda, which runs the Haar stages as kernels. The
+        CUDA classifier only reads old-format cascades, so the regular
+        haarcascade_eye.xml can't be used: copy haarcascade_eye.xml from OpenCV's
+        data/haarcascades_cuda/ next to this script as haarcascade_eye_cuda.xml.
+        Needs an OpenCV build with CUDA (the pip wheels have none).
+        """
+        model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'haarcascade_eye_cuda.xml')
+        if not os.path.exists(model_path):
+            return
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                print("⚠ haarcascade_eye_cuda.xml found, but OpenCV has no CUDA device — eye detection on CPU")
+                return
+            eye_cuda = cv2.cuda.CascadeClassifier_create(model_path)
+            eye_cuda.setScaleFactor(1.1)
+            eye_cuda.setMinNeighbors(5)
+            eye_cuda.setMinObjectSize((10, 10))
+            eye_cuda.setMaxObjectSize((48, 48))
+            self._eye_cuda = eye_cuda
+            self._gpu_gray = cv2.cuda_GpuMat()
+            print("✓ Eye detection on GPU (cv2.cuda cascade)")
+        except Exception as e:
+            print(f"⚠ Could not load CUDA eye cascade ({e}) — eye detection on CPU")
+            self._eye_cuda = None
+            self._gpu_gray = None
+    
+    def _load_face_yunet(self):
+        """
+        Load the INT8-quantized YuNet face detector (cv2.FaceDetectorYN) for the OpenCV
+        fallback path. Like the SSD, the model is not bundled; place
+        face_detection_yunet_2023mar_int8.onnx (OpenCV Zoo) next to this script.
+        """
+        model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'face_detection_yunet_2023mar_int8.onnx')
+        if not os.path.exists(model_path) or not hasattr(cv2, 'FaceDetectorYN'):
+            return
+        try:
+            self.face_yunet = cv2.FaceDetectorYN.create(model_path, "", (320, 320), 0.6, 0.3, 5000)
+            self._yunet_size = (320, 320)
+            print("✓ OpenCV YuNet INT8 face detector loaded")
+        except Exception as e:
+            print(f"⚠ Could not load YuNet face detector: {e}")
+            self.face_yunet = None
+    
+    def _detect_faces_yunet(self, frame):
+        """Detect faces with YuNet on a capped-size copy; returns full-frame (x, y, w, h) boxes"""
+        h, w = frame.shape[:2]
+        scale = min(1.0, FACE_DETECT_MAX_SIDE / max(h, w))
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        size = (frame.shape[1], frame.shape[0])
+        if size != self._yunet_size:
+            self.face_yunet.setInputSize(size)
+            self._yunet_size = size
+        _, detections = self.face_yunet.detect(frame)  # rows: [x, y, w, h, 5 landmarks, score]
+        if detections is None:
+            return []
+        faces = []
+        for x, y, bw, bh in (detections[:, :4] / scale).astype(int):
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(w, x + bw), min(h, y + bh)
+            if x2 > x1 and y2 > y1:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return faces
+    
+    def _load_face_ssd(self):
+        """
+        Load OpenCV's ResNet-10 SSD face detector for the OpenCV fallback path.
+        The model files are not part of opencv-python; place deploy.prototxt and
+        res10_300x300_ssd_iter_140000.caffemodel next to this script to enable it.
+        """
+        model_dir = os.path.dirname(os.path.abspath(__file__))
+        prototxt = os.path.join(model_dir, 'deploy.prototxt')
+        caffemodel = os.path.join(model_dir, 'res10_300x300_ssd_iter_140000.caffemodel')
+        if not (os.path.exists(prototxt) and os.path.exists(caffemodel)):
+            return
+        try:
+            self.face_net = cv2.dnn.readNetFromCaffe(prototxt, caffemodel)
+            backend = "CPU"
+            try:
+                if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                    self.face_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                    self.face_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+                    backend = "CUDA FP16"
+            except Exception:
+                pass
+            print(f"✓ OpenCV DNN face detector loaded ({backend})")
+        except Exception as e:
+            print(f"⚠ Could not load OpenCV DNN face detector: {e}")
+            self.face_net = None
+    
+    def _detect_faces_dnn(self, frame, min_confidence=0.5):
+        """Detect faces with the SSD; returns (x, y, w, h) boxes like detectMultiScale"""
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.face_net.setInput(blob)
+        detections = self.face_net.forward()[0, 0]  # rows: [_, _, conf, x1, y1, x2, y2]
+        detections = detections[detections[:, 2] > min_confidence]
+        faces = []
+        for x1, y1, x2, y2 in (detections[:, 3:7] * np.array([w, h, w, h])).astype(int):
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(w, x2), min(h, y2)
+            if x2 > x1 and y2 > y1:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return faces
     
     def _load_yolov8(self):
-        """Load YOLOv8l model for mobile phone detection"""
+        """Load YOLOv8l model for mobile phone detection (TensorRT INT8 engine on GPU when available)"""
+        self._yolo_device = 'cpu'
+        if not self.enable_mobile_detection:
+            return  # skip importing ultralytics entirely
+        # An exported yolov8l.onnx runs through OpenCV DNN with no ultralytics/torch
+        # overhead; a built TensorRT engine is still preferred over it
+        model_dir = os.path.dirname(os.path.abspath(__file__))
+        onnx_path = os.path.join(model_dir, 'yolov8l.onnx')
+        if (os.path.exists(onnx_path)
+                and not os.path.exists(os.path.join(model_dir, 'yolov8l_int8.engine'))
+                and self._load_yolov8_onnx(onnx_path)):
+            return
         try:
             import torch
             from ultralytics import YOLO
             model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'yolov8l.pt')
             if not os.path.exists(model_path):
                 model_path = 'yolov8l.pt'  # Try relative path
-            self.yolo_model = YOLO(model_path)
-            # Force YOLO onto GPU if available
             self._yolo_device = 0 if torch.cuda.is_available() else 'cpu'
+            if torch.cuda.is_available():
+                engine_path = self._yolov8_int8_engine(model_path)
+                if engine_path:
+                    try:
+                        self.yolo_model = YOLO(engine_path, task='detect')
+                        print(f"\u2713 YOLOv8l TensorRT INT8 engine loaded on GPU ({torch.cuda.get_device_name(0)}) for mobile phone detection")
+                        return
+                    except Exception as e:
+                        print(f"\u26a0 Could not load TensorRT engine ({e}) — using PyTorch weights")
+            self.yolo_model = YOLO(model_path)
+            # Force YOLO onto GPU if available, running in FP16 on tensor cores
             if torch.cuda.is_available():
                 self.yolo_model.to('cuda')
-                print(f"\u2713 YOLOv8l loaded on GPU ({torch.cuda.get_device_name(0)}) for mobile phone detection")
+                self._yolo_half = True
+                print(f"\u2713 YOLOv8l loaded on GPU ({torch.cuda.get_device_name(0)}, FP16) for mobile phone detection")
             else:
                 print("\u2713 YOLOv8l loaded for mobile phone detection (CPU)")
         except Exception as e:
@@ -331,6 +827,146 @@ class StudentMonitor:
             self.yolo_model = None
             self._yolo_device = 'cpu'
     
+    def _load_yolov8_onnx(self, onnx_path):
+        """Load YOLOv8l ONNX into cv2.dnn, on the CUDA FP16 target when OpenCV has CUDA"""
+        try:
+            net = cv2.dnn.readNetFromONNX(onnx_path)
+            backend = "CPU"
+            try:
+                if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA_FP16)
+                    backend = "CUDA FP16"
+            except Exception:
+                pass
+            self._yolo_net = net
+            print(f"\u2713 YOLOv8l ONNX loaded with OpenCV DNN ({backend}) for mobile phone detection")
+            return True
+        except Exception as e:
+            print(f"\u26a0 Could not load {os.path.basename(onnx_path)}: {e}")
+            return False
+    
+    def _yolov8_int8_engine(self, model_path):
+        """
+        Return the path of a TensorRT INT8 engine for YOLOv8l, building it once if possible.
+        
+        Building needs TensorRT plus a calibration dataset described by calib.yaml
+        next to the weights (~200 representative classroom frames). Returns None
+        when neither an engine nor calibration data exists, or the export fails.
+        """
+        model_dir = os.path.dirname(os.path.abspath(model_path))
+        engine_path = os.path.join(model_dir, 'yolov8l_int8.engine')
+        if os.path.exists(engine_path):
+            return engine_path
+        calib_data = os.path.join(model_dir, 'calib.yaml')
+        if not os.path.exists(calib_data):
+            return None
+        try:
+            from ultralytics import YOLO
+            print("⏳ Building TensorRT INT8 engine for YOLOv8l (one-time, may take several minutes)...")
+            exported = YOLO(model_path).export(
+                format='engine', int8=True, half=False, dynamic=False,
+                batch=1, workspace=4, data=calib_data, device=0
+            )
+            os.replace(exported, engine_path)
+            return engine_path
+        except Exception as e:
+            print(f"\u26a0 TensorRT INT8 export failed: {e}")
+            return None
+    
+    def _recognizer_fingerprint(self):
+        """Which recognizer produced the cached vectors; a change invalidates the whole cache"""
+        return json.dumps({
+            'facenet': FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None,
+            'face_recognition': FACE_RECOGNITION_AVAILABLE,
+            'model': FACE_RECOGNITION_MODEL,
+        }, sort_keys=True)
+    
+    def _zip_digests(self):
+        """
+        SHA-1 of every student zip's contents, keyed by absolute path, so touched but
+        unchanged zips still hit the training cache. None if the zips can't be read.
+        """
+        try:
+            if os.path.isdir(self.student_photos_path):
+                paths = [os.path.join(self.student_photos_path, f)
+                         for f in sorted(os.listdir(self.student_photos_path))
+                         if f.lower().endswith('.zip')]
+            else:
+                paths = [self.student_photos_path]
+            digests = {}
+            for path in paths:
+                sha1 = hashlib.sha1()
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        sha1.update(block)
+                digests[os.path.abspath(path)] = sha1.hexdigest()
+            return digests
+        except OSError:
+            return None
+    
+    def _training_stores(self):
+        """(cache key, dict) pairs for every kind of trained face representation"""
+        return (('facenet', self.facenet_embeddings),
+                ('dlib', self.known_face_encodings),
+                ('opencv', self.known_faces))
+    
+    def _load_training_cache(self, recognizer, digests):
+        """
+        Fill the trained-face dicts from TRAINING_CACHE_FILE with the rows that came
+        from zips whose digest is in digests. Returns the set of digests loaded.
+        """
+        if not digests or not os.path.exists(TRAINING_CACHE_FILE):
+            return set()
+        try:
+            with np.load(TRAINING_CACHE_FILE, allow_pickle=False) as cache:
+                if str(cache['manifest']) != recognizer:
+                    return set()
+                loaded = set()
+                for key, store in self._training_stores():
+                    # Select the still-valid rows with one mask instead of testing row by row
+                    sources = cache[f'{key}_sources']
+                    keep = np.isin(sources, list(digests))
+                    if not keep.any():
+                        continue
+                    loaded.update(np.unique(sources[keep]).tolist())
+                    vectors = cache[f'{key}_vectors'][keep]
+                    for name, vector in zip(cache[f'{key}_names'][keep].tolist(), vectors):
+                        if name not in self.student_data:
+                            self._initialize_student_data(name)
+                        store.setdefault(name, []).append(vector)
+            return loaded
+        except Exception as e:
+            print(f"⚠ Ignoring unreadable training cache: {e}")
+            for _, store in self._training_stores():
+                store.clear()
+            self.student_data.clear()
+            return set()
+    
+    def _save_training_cache(self, recognizer, source_of):
+        """
+        Write every trained face vector to TRAINING_CACHE_FILE, atomically, tagging each
+        row with the digest of the zip it came from (source_of maps student name → digest)
+        """
+        arrays = {'manifest': np.array(recognizer)}
+        for key, store in self._training_stores():
+            names = [name for name, vectors in store.items() for _ in vectors]
+            arrays[f'{key}_names'] = np.array(names, dtype=str)
+            arrays[f'{key}_sources'] = np.array([source_of(name) for name in names], dtype=str)
+            if names:
+                arrays[f'{key}_vectors'] = np.vstack([
+                    vector for vectors in store.values() for vector in vectors
+                ]).astype(np.float32)
+            else:
+                arrays[f'{key}_vectors'] = np.zeros((0, 0), dtype=np.float32)
+        tmp_path = TRAINING_CACHE_FILE.replace('.npz', '.tmp.npz')
+        try:
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, TRAINING_CACHE_FILE)
+            print(f"💾 Face training cached to {TRAINING_CACHE_FILE}")
+        except Exception as e:
+            print(f"⚠ Could not write training cache: {e}")
+    
     def _extract_nested_zips(self, extract_path):
         """Recursively extract nested zip files (e.g., basistha.zip, sarbeswar.zip)"""
         for item in os.listdir(extract_path):
@@ -356,12 +992,35 @@ class StudentMonitor:
         Supports: basistha.zip, sarbeswar.zip, etc. (student name = zip filename)
         Trains ML model on student faces - NO HARDCODED NAMES
         """
-        # Create temporary directory for extracted photos
+        # Reuse the previous run's training for every zip whose contents are unchanged
+        # (same recognizer too); only new or modified zips are extracted and trained
+        recognizer = self._recognizer_fingerprint()
+        digests = self._zip_digests()
+        pending = None  # zip paths that still need training; None means all of them
+        if digests:
+            cached = self._load_training_cache(recognizer, set(digests.values()))
+            pending = {path for path, digest in digests.items() if digest not in cached}
+            if cached and not pending:
+                if os.path.isdir(self.student_photos_path):
+                    self.registered_students = sorted(
+                        os.path.splitext(f)[0] for f in os.listdir(self.student_photos_path)
+                        if f.lower().endswith('.zip')
+                    )
+                print(f"⚡ Loaded cached face training for {len(self.student_data)} students "
+                      f"(delete {TRAINING_CACHE_FILE} to retrain)")
+                return
+            if cached:
+                print(f"⚡ Reusing cached face training for {len(self.student_data)} students; "
+                      f"training {len(pending)} new or changed zip(s)")
+        
+        # Temporary directory for photos extracted from a single (nested) zip
         extract_path = "student_photos_temp"
         if os.path.exists(extract_path):
             shutil.rmtree(extract_path)
         os.makedirs(extract_path, exist_ok=True)
         
+        students_trained = 0
+        images = []  # (image source, student name)
         try:
             # Determine if path is a directory or a file
             if os.path.isdir(self.student_photos_path):
@@ -378,17 +1037,22 @@ class StudentMonitor:
                     return
                 
                 print(f"📦 Found {len(zip_files)} student zip files")
+                self.registered_students = sorted(os.path.splitext(f)[0] for f in zip_files)
                 
-                # Extract each student's zip file
+                # Photos are decoded straight from each student's zip, never written to disk
                 for zip_file in zip_files:
                     student_name = os.path.splitext(zip_file)[0]
                     zip_path = os.path.join(self.student_photos_path, zip_file)
-                    student_folder = os.path.join(extract_path, student_name)
-                    os.makedirs(student_folder, exist_ok=True)
+                    if pending is not None and os.path.abspath(zip_path) not in pending:
+                        continue  # trained vectors came from the cache
                     
-                    print(f"  📦 Extracting {zip_file} → {student_name}/")
+                    print(f"  📦 Reading {zip_file} → {student_name}")
                     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                        zip_ref.extractall(student_folder)
+                        images.extend(
+                            ((zip_path, member), student_name) for member in zip_ref.namelist()
+                            if member.lower().endswith(IMAGE_EXTENSIONS)
+                            and not member.startswith('__MACOSX/')
+                        )
             
             elif os.path.isfile(self.student_photos_path) and self.student_photos_path.lower().endswith('.zip'):
                 # Single zip file: extract and check for nested zips
@@ -402,13 +1066,11 @@ class StudentMonitor:
                 print(f"❌ Error: {self.student_photos_path} is not a valid directory or zip file!")
                 return
             
-            # Recursively find all image files
+            # Recursively find all image files extracted from a single zip
             print("\n🔍 Scanning for student photos...")
-            students_trained = 0
-            
             for root, dirs, files in os.walk(extract_path):
                 for filename in files:
-                    if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
                         # Determine student name from folder or filename
                         img_path = os.path.join(root, filename)
                         
@@ -421,13 +1083,21 @@ class StudentMonitor:
                             # Use folder name (for nested zips like basistha.zip)
                             student_name = parent_folder
                         
-                        # Load and train on this image
-                        success = self._train_on_image(img_path, student_name)
-                        if success:
-                            students_trained += 1
+                        images.append((img_path, student_name))
+            
+            # Load and train on every image
+            if self._use_parallel_training(len(images)):
+                students_trained = self._train_parallel(images)
+            elif FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None:
+                students_trained = self._train_facenet_batched(images)
+            else:
+                # Disk reads and decoding of the next images overlap with encoding this one
+                decoded = _prefetch_images(img_path for img_path, _ in images)
+                for (img_path, student_name), rgb_image in zip(images, decoded):
+                    if self._train_on_image(img_path, student_name, rgb_image):
+                        students_trained += 1
             
             if FACENET_AVAILABLE and self.facenet_embeddings:
-                import torch
                 total_students = len(self.facenet_embeddings)
                 gpu_name = torch.cuda.get_device_name(0) if CUDA_AVAILABLE else "CPU"
                 method = f"facenet-pytorch {'GPU (' + gpu_name + ')' if CUDA_AVAILABLE else 'CPU'} — 512-d embeddings"
@@ -444,45 +1114,151 @@ class StudentMonitor:
             print(f"📸 Total photos processed: {students_trained}")
             print(f"🤖 Recognition method: {method}")
             print(f"{'='*70}\n")
+            
+            if digests and self.student_data:
+                if os.path.isdir(self.student_photos_path):
+                    # One zip per student, named after them
+                    by_stem = {os.path.splitext(os.path.basename(path))[0]: digest
+                               for path, digest in digests.items()}
+                    source_of = lambda name: by_stem.get(name, '')
+                else:
+                    single_digest = next(iter(digests.values()))
+                    source_of = lambda name: single_digest
+                self._save_training_cache(recognizer, source_of)
         
         except Exception as e:
             print(f"❌ Error loading student photos: {e}")
     
-    def _train_on_image(self, img_path, student_name):
+    def _use_parallel_training(self, image_count):
+        """
+        dlib HOG encoding is pure CPU work, so spread it over processes. The facenet
+        path already batches on its own device, and dlib's CNN model would have
+        every worker competing for the same GPU.
+        """
+        facenet_ready = FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None
+        return (FACE_RECOGNITION_AVAILABLE and not facenet_ready
+                and FACE_RECOGNITION_MODEL == "hog" and image_count > 1)
+    
+    def _train_parallel(self, images):
+        """Encode training images across CPU cores; returns the number of images trained on"""
+        try:
+            # Each spawned worker imports dlib and its models, so don't start more than
+            # there are images, nor more than TRAINING_WORKERS
+            workers = min(os.cpu_count() or 1, len(images), TRAINING_WORKERS)
+            paths, names = zip(*images)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(encode_image, paths, names,
+                                            itertools.repeat(FACE_RECOGNITION_MODEL)))
+        except Exception as e:
+            print(f"  ⚠ Parallel training unavailable ({e}), training serially")
+            return sum(1 for img_path, student_name in images if self._train_on_image(img_path, student_name))
+        
+        trained = 0
+        for img_path, student_name, encoding in results:
+            if isinstance(encoding, str):
+                # face_recognition failed on this image; the serial path falls back to OpenCV
+                if self._train_on_image(img_path, student_name):
+                    trained += 1
+            elif encoding is None:
+                print(f"  ⚠ No face detected in: {image_label(img_path)}")
+            else:
+                self._add_known_encoding(student_name, encoding, img_path)
+                trained += 1
+        return trained
+    
+    def _train_facenet_batched(self, images, batch_size=32):
+        """
+        Train the facenet path in batches: MTCNN runs once per group of equally sized
+        photos (its batch mode needs equal dimensions) and InceptionResnetV1 once per
+        batch of aligned faces. Returns the number of images trained on.
+        """
+        buckets = {}
+        trained = 0
+        for (img_path, student_name), rgb_image in zip(images, _prefetch_images(p for p, _ in images)):
+            if rgb_image is None:
+                # Unreadable by PIL; the per-image path reports or falls back on it
+                trained += self._train_on_image(img_path, student_name)
+                continue
+            bucket = buckets.setdefault(rgb_image.shape, [])
+            bucket.append((img_path, student_name, rgb_image))
+            if len(bucket) == batch_size:
+                trained += self._train_facenet_bucket(bucket)
+                bucket.clear()
+        for bucket in buckets.values():
+            if bucket:
+                trained += self._train_facenet_bucket(bucket)
+        return trained
+    
+    def _train_facenet_bucket(self, bucket):
+        """Embed one batch of equally sized training photos; per-image fallback on failure"""
+        try:
+            face_batches = self.mtcnn([PILImage.fromarray(rgb) for _, _, rgb in bucket])
+            kept = []
+            faces = []
+            for (img_path, student_name, _), face_tensor in zip(bucket, face_batches):
+                if face_tensor is None:
+                    print(f"  ⚠ No face detected in: {image_label(img_path)}")
+                    continue
+                # keep_all=True gives (N, 3, 160, 160); training photos use the first face
+                faces.append(face_tensor[0] if face_tensor.dim() == 4 else face_tensor)
+                kept.append((img_path, student_name))
+            if not faces:
+                return 0
+            embeddings = self._resnet_embed(torch.stack(faces))
+        except Exception as e:
+            print(f"  ⚠ Batched facenet training failed ({e}), training image by image")
+            return sum(self._train_on_image(img_path, name, rgb) for img_path, name, rgb in bucket)
+        
+        for (img_path, student_name), embedding in zip(kept, embeddings):
+            if student_name not in self.facenet_embeddings:
+                self.facenet_embeddings[student_name] = []
+                self._initialize_student_data(student_name)
+            self.facenet_embeddings[student_name].append(embedding)
+            print(f"  ✓ [GPU] Trained on: {student_name} ({image_label(img_path)})")
+        return len(kept)
+    
+    def _add_known_encoding(self, student_name, encoding, img_path):
+        """Record a dlib training encoding for a student"""
+        if student_name not in self.known_face_encodings:
+            self.known_face_encodings[student_name] = []
+            self._initialize_student_data(student_name)
+        self.known_face_encodings[student_name].append(encoding)
+        print(f"  ✓ Trained on: {student_name} ({image_label(img_path)})")
+    
+    def _train_on_image(self, img_path, student_name, rgb_image=None):
         """
         Train the model on a single image
         
         Args:
-            img_path: Path to image file
+            img_path: Path to image file, or (zip path, member name)
             student_name: Name of the student (from folder/filename)
+            rgb_image: Already decoded RGB image, if prefetched (else read from img_path)
         
         Returns:
             Boolean indicating success
         """
         try:
+            if rgb_image is None:
+                rgb_image = decode_image(img_path)
             # ── Path 1: facenet-pytorch on GPU (fastest & most accurate) ──────
             if FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None:
                 try:
-                    import torch
-                    from PIL import Image as PILImage
-                    img_pil = PILImage.open(img_path).convert('RGB')
+                    img_pil = PILImage.fromarray(rgb_image)
                     # MTCNN detects, aligns, and crops face to 160×160
                     face_tensor = self.mtcnn(img_pil)   # shape: (N, 3, 160, 160) or None
                     if face_tensor is not None:
                         # Take first face only (training images should have one face)
                         if face_tensor.dim() == 4:
                             face_tensor = face_tensor[0].unsqueeze(0)
-                        face_tensor = face_tensor.to(FACENET_DEVICE)
-                        with torch.no_grad():
-                            embedding = self.resnet(face_tensor).cpu().numpy()[0]  # 512-d
+                        embedding = self._resnet_embed(face_tensor)[0]  # 512-d
                         if student_name not in self.facenet_embeddings:
                             self.facenet_embeddings[student_name] = []
                             self._initialize_student_data(student_name)
                         self.facenet_embeddings[student_name].append(embedding)
-                        print(f"  ✓ [GPU] Trained on: {student_name} ({os.path.basename(img_path)})")
+                        print(f"  ✓ [GPU] Trained on: {student_name} ({image_label(img_path)})")
                         return True
                     else:
-                        print(f"  ⚠ No face detected in: {os.path.basename(img_path)}")
+                        print(f"  ⚠ No face detected in: {image_label(img_path)}")
                         return False
                 except Exception as fe_err:
                     print(f"  ⚠ facenet GPU training failed, falling back: {fe_err}")
@@ -491,27 +1267,29 @@ class StudentMonitor:
             # ── Path 2: face_recognition (dlib, CPU) ─────────────────────────
             if FACE_RECOGNITION_AVAILABLE:
                 try:
-                    image = face_recognition.load_image_file(img_path)
+                    image = rgb_image
                     face_locations = face_recognition.face_locations(image, model=FACE_RECOGNITION_MODEL)
                     face_encodings = face_recognition.face_encodings(
                         image, known_face_locations=face_locations, num_jitters=10
                     )
                     if len(face_encodings) > 0:
-                        if student_name not in self.known_face_encodings:
-                            self.known_face_encodings[student_name] = []
-                            self._initialize_student_data(student_name)
-                        self.known_face_encodings[student_name].append(face_encodings[0])
-                        print(f"  ✓ Trained on: {student_name} ({os.path.basename(img_path)})")
+                        self._add_known_encoding(student_name, face_encodings[0], img_path)
                         return True
                     else:
-                        print(f"  ⚠ No face detected in: {os.path.basename(img_path)}")
+                        print(f"  ⚠ No face detected in: {image_label(img_path)}")
                         return False
                 except Exception as fr_error:
-                    print(f"  ⚠ ML method failed, using OpenCV for: {os.path.basename(img_path)}")
+                    print(f"  ⚠ ML method failed, using OpenCV for: {image_label(img_path)}")
                     # Fall through to OpenCV method below
             
             # OpenCV fallback method
-            img = cv2.imread(img_path)
+            if rgb_image is not None:
+                img = cv2.cvtColor(rgb_image, cv2.COLOR_RGB2BGR)
+            else:
+                # imdecode over the raw bytes also handles zip members and non-ASCII
+                # Windows paths, which imread can't
+                with open_image_source(img_path) as fp:
+                    img = cv2.imdecode(np.frombuffer(fp.read(), dtype=np.uint8), cv2.IMREAD_COLOR)
             if img is not None:
                 gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
                 faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
@@ -524,12 +1302,15 @@ class StudentMonitor:
                         self.known_faces[student_name] = []
                         self._initialize_student_data(student_name)
                     
-                    self.known_faces[student_name].append(face_img)
-                    print(f"  ✓ Trained on: {student_name} ({os.path.basename(img_path)})")
+                    # Only the histogram is needed for matching, so compute it once here
+                    self.known_faces[student_name].append(self._face_histogram(face_img))
+                    print(f"  ✓ Trained on: {student_name} ({image_label(img_path)})")
                     return True
                 return False
+            print(f"  ⚠ Could not decode: {image_label(img_path)}")
+            return False
         except Exception as e:
-            print(f"  ⚠ Error processing {os.path.basename(img_path)}: {e}")
+            print(f"  ⚠ Error processing {image_label(img_path)}: {e}")
             return False
     
     def _initialize_student_data(self, student_name):
@@ -543,317 +1324,616 @@ class StudentMonitor:
             'alerts': []
         }
     
-    def detect_gaze(self, face_region):
+    def detect_gaze(self, gray_face_region, face_box=None):
         """
         Detect if person is looking at camera by detecting eyes
         
         Args:
-            face_region: Cropped face image region
+            gray_face_region: Cropped face region of the grayscale frame
+            face_box: (left, top, right, bottom) of the crop in the frame; lets the
+                CUDA cascade slice the already-uploaded gray frame instead
         
         Returns:
             Boolean indicating if person is focused (looking at camera)
         """
-        gray_face = cv2.cvtColor(face_region, cv2.COLOR_BGR2GRAY)
-        eyes = self.eye_cascade.detectMultiScale(gray_face, 1.1, 5)
+        if self._eye_cuda is not None and face_box is not None:
+            try:
+                return self._count_eyes_cuda(face_box) >= 2
+            except cv2.error as e:
+                print(f"⚠ CUDA eye cascade failed ({e}) — using CPU cascade")
+                self._eye_cuda = None
+        # A fixed 96x96 crop is plenty to tell whether eyes are visible, and the
+        # cascade cost no longer grows with the face size; maxSize caps the pyramid.
+        # This stays a host Mat even with OpenCL on: at 96x96 the UMat upload and
+        # kernel launches cost more than the cascade itself.
+        gray_face = cv2.resize(gray_face_region, (96, 96))
+        eyes = self.eye_cascade.detectMultiScale(gray_face, 1.1, 5, minSize=(10, 10), maxSize=(48, 48))
         
         # If both eyes are visible, person is likely looking at camera
         if len(eyes) >= 2:
             return True
         return False
     
-    def detect_mobile(self, frame):
+    def _count_eyes_cuda(self, face_box):
+        """Run the CUDA eye cascade on a face ROI of the gray frame, uploading it on first use"""
+        if self._gpu_gray_pending is not None:
+            self._gpu_gray.upload(self._gpu_gray_pending)
+            self._gpu_gray_pending = None
+        width, height = self._gpu_gray.size()
+        left, top, right, bottom = face_box
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(width, right), min(height, bottom)
+        if right <= left or bottom <= top:
+            return 0
+        roi = cv2.cuda_GpuMat(self._gpu_gray, (left, top, right - left, bottom - top))
+        gray_face = cv2.cuda.resize(roi, (96, 96))
+        return len(self._eye_cuda.convert(self._eye_cuda.detectMultiScale(gray_face)))
+    
+    def _submit_mobile_frame(self, frame, gray_frame):
+        """
+        Hand a frame to the mobile detector thread, or detect inline if it isn't running.
+        The frame is dropped while the detector is still busy with an earlier one.
+        """
+        if self._mobile_thread is None:
+            detected = self.detect_mobile(frame, gray_frame)
+            self._mobile_result = (detected, list(self.mobile_detection_boxes))
+            return
+        try:
+            # process_frame draws on the BGR frame, so the detector gets a copy;
+            # the gray frame is never drawn on
+            self._mobile_queue.put_nowait((frame.copy(), gray_frame))
+        except queue.Full:
+            pass
+    
+    def _mobile_worker(self):
+        """Background thread: run mobile detection on submitted frames until a None arrives"""
+        while True:
+            item = self._mobile_queue.get()
+            if item is None:
+                break
+            detected = self.detect_mobile(*item)
+            # One tuple assignment, so process_frame never sees a half-updated result
+            self._mobile_result = (detected, list(self.mobile_detection_boxes))
+    
+    def detect_mobile(self, frame, gray_frame=None):
         """
         Detect mobile phone in frame using YOLOv8l.
         Falls back to basic edge detection if YOLOv8l is unavailable.
         
         Args:
             frame: Video frame to analyze
+            gray_frame: Grayscale version of frame, if already computed
         
         Returns:
             Boolean indicating if mobile phone detected
         """
         if not self.enable_mobile_detection:
             return False
+        if self._yolo_net is not None:
+            return self._detect_mobile_onnx(frame, gray_frame)
         if self.yolo_model is not None:
-            return self._detect_mobile_yolov8(frame)
-        return self._detect_mobile_basic(frame)
+            return self._detect_mobile_yolov8(frame, gray_frame)
+        if gray_frame is None:
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return self._detect_mobile_basic(gray_frame)
     
-    def _detect_mobile_yolov8(self, frame):
+    def _detect_mobile_yolov8(self, frame, gray_frame=None):
         """Detect mobile phone using YOLOv8l (COCO class 67: cell phone)"""
         try:
             self.mobile_detection_boxes = []
             device = getattr(self, '_yolo_device', 0)
-            results = self.yolo_model(frame, verbose=False, conf=0.25, device=device)
+            # YOLO letterboxes to 640px internally and returns boxes in frame coordinates
+            # Only COCO class 67 (cell phone) is kept, so NMS skips the other 79 classes
+            results = self.yolo_model(frame, verbose=False, conf=0.25, device=device,
+                                      half=self._yolo_half, imgsz=640,
+                                      classes=[67], max_det=5, agnostic_nms=True)
             detected = False
             for result in results:
                 for box in result.boxes:
-                    cls_id = int(box.cls[0])
+                    detected = True
                     confidence = float(box.conf[0])
-                    if cls_id == 67:  # COCO class 67 = cell phone
-                        detected = True
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        self.mobile_detection_boxes.append({
-                            'box': (x1, y1, x2 - x1, y2 - y1),
-                            'confidence': confidence,
-                            'class': 'cell phone'
-                        })
-                        print(f"\U0001f4f1 MOBILE DETECTED (YOLOv8l)! Confidence: {confidence:.2f}")
+                    x1, y1, x2, y2 = map(int, box.xyxy[0])
+                    self.mobile_detection_boxes.append({
+                        'box': (x1, y1, x2 - x1, y2 - y1),
+                        'confidence': confidence,
+                        'class': 'cell phone'
+                    })
+                    print(f"\U0001f4f1 MOBILE DETECTED (YOLOv8l)! Confidence: {confidence:.2f}")
             return detected
         except Exception as e:
             print(f"YOLOv8l detection error: {e}")
-            return self._detect_mobile_basic(frame)
+            if gray_frame is None:
+                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            return self._detect_mobile_basic(gray_frame)
     
-    def _detect_mobile_basic(self, frame):
-        """Basic mobile phone detection using edge detection (fallback)"""
+    def _detect_mobile_onnx(self, frame, gray_frame=None):
+        """Detect mobile phone with YOLOv8l ONNX in cv2.dnn (COCO class 67: cell phone)"""
+        try:
+            self.mobile_detection_boxes = []
+            h, w = frame.shape[:2]
+            blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (640, 640), swapRB=True, crop=False)
+            self._yolo_net.setInput(blob)
+            output = self._yolo_net.forward()[0]  # (84, 8400): cx, cy, w, h, then 80 class scores
+            scores = output[4 + 67]
+            keep = scores > 0.25
+            if not keep.any():
+                return False
+            cx, cy, bw, bh = output[:4, keep]
+            sx, sy = w / 640.0, h / 640.0
+            boxes = np.stack([(cx - bw / 2) * sx, (cy - bh / 2) * sy, bw * sx, bh * sy], axis=1)
+            confidences = scores[keep]
+            # NMS only over the phone candidates
+            indices = cv2.dnn.NMSBoxes(boxes.tolist(), confidences.tolist(), 0.25, 0.45)
+            for i in np.array(indices).flatten()[:5]:
+                x, y, bw_i, bh_i = boxes[i].astype(int)
+                confidence = float(confidences[i])
+                self.mobile_detection_boxes.append({
+                    'box': (int(x), int(y), int(bw_i), int(bh_i)),
+                    'confidence': confidence,
+                    'class': 'cell phone'
+                })
+                print(f"\U0001f4f1 MOBILE DETECTED (YOLOv8l ONNX)! Confidence: {confidence:.2f}")
+            return bool(self.mobile_detection_boxes)
+        except Exception as e:
+            print(f"YOLOv8l ONNX detection error: {e}")
+            if gray_frame is None:
+                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            return self._detect_mobile_basic(gray_frame)
+    
+    def _detect_mobile_basic(self, gray_frame):
+        """Basic mobile phone detection using edge detection on a grayscale frame (fallback)"""
         # NOTE: Basic detection has high false positive rate
         # It can detect books, bottles, hands, etc. as phones
         # Used only as fallback when YOLOv8l is unavailable
         
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # Blur and edge detection run on OpenCL when available
+        gray = cv2.UMat(gray_frame) if self._use_opencl else gray_frame
         
         # Apply blur to reduce noise
         gray = cv2.GaussianBlur(gray, (5, 5), 0)
         
         # Detect rectangular objects that might be phones
         edges = cv2.Canny(gray, 100, 200)  # Higher thresholds to reduce false positives
+        if self._use_opencl:
+            edges = edges.get()
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        phone_candidates = 0
-        for contour in contours:
-            # Filter small contours
-            if cv2.contourArea(contour) < 2000:  # Minimum area threshold
-                continue
-                
-            x, y, w, h = cv2.boundingRect(contour)
-            aspect_ratio = h / float(w) if w > 0 else 0
-            
-            # Stricter phone-like aspect ratio and size
-            # Phones are typically 1.6-2.2 aspect ratio
-            if 1.6 < aspect_ratio < 2.2 and 60 < w < 150 and 120 < h < 350:
-                phone_candidates += 1
+        if not contours:
+            return False
+        
+        # Evaluate the filters for all contours at once as boolean masks
+        areas = np.array([cv2.contourArea(c) for c in contours], dtype=np.float32)
+        w, h = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32)[:, 2:].T
+        # Stricter phone-like aspect ratio and size
+        # Phones are typically 1.6-2.2 aspect ratio (w > 60 also rules out w == 0)
+        aspect_ratio = h / np.maximum(w, 1)
+        phone_like = ((areas >= 2000)  # Minimum area threshold
+                      & (aspect_ratio > 1.6) & (aspect_ratio < 2.2)
+                      & (w > 60) & (w < 150) & (h > 120) & (h < 350))
+        phone_candidates = int(np.count_nonzero(phone_like))
         
         # Only return True if multiple candidates detected (reduces single-object false positives)
         return phone_candidates >= 2
     
-    def _facenet_embed(self, face_bgr_img):
-        """Get 512-d facenet embedding for a BGR face crop. Returns None on failure."""
+    def _resnet_embed(self, faces):
+        """
+        Run InceptionResnetV1 on an (N, 3, 160, 160) batch of aligned faces and return
+        float32 (N, 512) embeddings; on CUDA the input matches the fp16 channels_last model
+        """
+        n = len(faces)
+        if self._face_stage is not None and faces.device.type == 'cpu' and n <= FACE_STAGE_SIZE:
+            # Cast into pinned memory so the upload is a half-size async DMA; the
+            # .cpu() below synchronizes before the buffer is reused
+            staged = self._face_stage[:n]
+            staged.copy_(faces)
+            faces = staged.to(FACENET_DEVICE, non_blocking=True)
+        faces = faces.to(FACENET_DEVICE, dtype=self._resnet_dtype, memory_format=torch.channels_last)
+        with torch.inference_mode():
+            return self.resnet(faces).float().cpu().numpy()
+    
+    def _facenet_embed(self, face_bgr_img, face_rgb=None):
+        """
+        Get 512-d facenet embedding for a BGR face crop. Returns None on failure.
+        face_rgb is the same crop already in RGB, when the caller has it.
+        """
         try:
-            import torch
-            from PIL import Image as PILImage
-            face_rgb = cv2.cvtColor(face_bgr_img, cv2.COLOR_BGR2RGB)
+            if face_rgb is None:
+                face_rgb = cv2.cvtColor(face_bgr_img, cv2.COLOR_BGR2RGB)
             img_pil = PILImage.fromarray(face_rgb)
             face_tensor = self.mtcnn(img_pil)
             if face_tensor is None:
                 return None
             if face_tensor.dim() == 4:
                 face_tensor = face_tensor[0].unsqueeze(0)
-            face_tensor = face_tensor.to(FACENET_DEVICE)
-            with torch.no_grad():
-                embedding = self.resnet(face_tensor).cpu().numpy()[0]
-            return embedding
+            return self._resnet_embed(face_tensor)[0]
         except Exception:
             return None
 
-    def match_face(self, face_img, face_location=None):
+    def _facenet_embed_batch(self, img_pil, boxes):
+        """
+        512-d facenet embeddings for every box in one frame, as an (N, 512) array.
+        MTCNN aligns the crops from the boxes it already found (no second detection
+        per crop) and InceptionResnetV1 encodes them in a single forward pass.
+        """
+        if len(boxes) == 0:
+            return np.empty((0, 512), dtype=np.float32)
+        faces = self.mtcnn.extract(img_pil, boxes, None)  # (N, 3, 160, 160)
+        return self._resnet_embed(faces)
+    
+    def _match_embeddings(self, embeddings):
+        """Label each row of an (N, 512) embedding array by its nearest known embedding"""
+        if len(embeddings) == 0:
+            return []
+        probes = embeddings.astype(np.float32)
+        probes /= np.maximum(np.linalg.norm(probes, axis=1, keepdims=True), 1e-8)
+        # (N, M) cosine similarities from a single GEMM
+        similarities = probes @ self._emb_matrix.T
+        best = similarities.argmax(axis=1)
+        best_sim = similarities[np.arange(len(best)), best]
+        return [str(self._emb_labels[b]) if sim > FACENET_COS_THRESHOLD else "Unknown"
+                for b, sim in zip(best, best_sim)]
+    
+    def _build_embedding_matrix(self):
+        """Stack all facenet training embeddings into one matrix so matching is a single vectorized pass"""
+        labels = [name for name, embeddings in self.facenet_embeddings.items() for _ in embeddings]
+        if not labels:
+            self._emb_matrix = None
+            self._emb_labels = None
+            return
+        self._emb_matrix = np.vstack([
+            emb for embeddings in self.facenet_embeddings.values() for emb in embeddings
+        ]).astype(np.float32)
+        # Unit rows turn matching into one matrix product (cosine similarity)
+        self._emb_matrix /= np.maximum(np.linalg.norm(self._emb_matrix, axis=1, keepdims=True), 1e-8)
+        self._emb_labels = np.array(labels)
+    
+    def _build_encoding_matrix(self):
+        """Stack all dlib training encodings into one matrix so matching is a single vectorized pass"""
+        labels = [name for name, encodings in self.known_face_encodings.items() for _ in encodings]
+        self._enc_quant = None
+        if not labels:
+            self._enc_matrix = None
+            self._enc_labels = None
+            return
+        self._enc_matrix = np.vstack([
+            enc for encodings in self.known_face_encodings.values() for enc in encodings
+        ]).astype(np.float32)
+        self._enc_labels = np.array(labels)
+        if len(labels) >= ENCODING_PREFILTER_MIN_ROWS:
+            self._enc_quant = _quantize_encodings(self._enc_matrix)
+    
+    @staticmethod
+    def _face_histogram(face_img):
+        """Normalized 8x8x8 BGR histogram of a face crop resized to 100x100, flattened to 512 floats"""
+        hist = cv2.calcHist([cv2.resize(face_img, (100, 100))], [0, 1, 2], None,
+                            [8, 8, 8], [0, 256, 0, 256, 0, 256])
+        return cv2.normalize(hist, hist).flatten()
+    
+    def _build_histogram_matrix(self):
+        """Stack the OpenCV fallback histograms into one matrix for a vectorized chi-square"""
+        labels = [name for name, hists in self.known_faces.items() for _ in hists]
+        if not labels:
+            self._hist_matrix = None
+            self._hist_labels = None
+            return
+        self._hist_matrix = np.vstack([
+            hist for hists in self.known_faces.values() for hist in hists
+        ]).astype(np.float32)
+        self._hist_labels = np.array(labels)
+    
+    def _match_encoding(self, face_encoding):
+        """Return the student whose known encoding is nearest to face_encoding, or "Unknown" """
+        face_encoding = face_encoding.astype(np.float32)
+        rows = None
+        if self._enc_quant is not None:
+            # L2 >= L-inf, so a row whose quantized L-inf distance already exceeds the
+            # threshold (plus rounding slack) cannot match; only survivors get exact L2
+            linf = np.abs(self._enc_quant - _quantize_encodings(face_encoding)).max(axis=1)
+            rows = np.flatnonzero(linf <= ENCODING_QUANT_SCALE * 0.40 + 1)
+            if rows.size == 0:
+                return "Unknown"
+        known = self._enc_matrix if rows is None else self._enc_matrix[rows]
+        # Squared Euclidean distance to every known encoding at once; comparing against
+        # the squared threshold gives the same answer as face_distance without the sqrt
+        diffs = known - face_encoding
+        sq_distances = np.einsum('ij,ij->i', diffs, diffs)
+        best = int(sq_distances.argmin())
+        if sq_distances[best] < 0.40 ** 2:
+            return str(self._enc_labels[best if rows is None else rows[best]])
+        return "Unknown"
+    
+    def match_face(self, face_img, face_location=None, face_rgb=None):
         """
         Match detected face with known student faces using ML
 
         Priority: facenet-pytorch GPU → face_recognition CPU → OpenCV histogram
+
+        face_rgb is the same region sliced from the frame's RGB conversion, which
+        saves the ML paths a colour conversion; the histogram path stays on BGR.
         """
         # ── Path 1: facenet-pytorch GPU matching ─────────────────────────────
-        if FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None and self.facenet_embeddings:
+        if FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None and self._emb_matrix is not None:
             try:
-                import numpy as np
-                probe = self._facenet_embed(face_img)
+                probe = self._facenet_embed(face_img, face_rgb)
                 if probe is not None:
-                    best_match = "Unknown"
-                    best_dist = 0.75  # L2 distance threshold (≤0.75 = same person; family ~0.85+)
-                    for student_name, embeddings in self.facenet_embeddings.items():
-                        for known_emb in embeddings:
-                            dist = float(np.linalg.norm(probe - known_emb))
-                            if dist < best_dist:
-                                best_dist = dist
-                                best_match = student_name
-                    return best_match
+                    return self._match_embeddings(probe[None, :])[0]
             except Exception as e:
                 pass  # fall through
 
         # ── Path 2: face_recognition (dlib) ──────────────────────────────────
-        if FACE_RECOGNITION_AVAILABLE and face_location is not None and self.known_face_encodings:
+        if FACE_RECOGNITION_AVAILABLE and face_location is not None and self._enc_matrix is not None:
             try:
-                rgb_frame = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB) if len(face_img.shape) == 3 else face_img
+                if face_rgb is not None:
+                    rgb_frame = face_rgb
+                else:
+                    rgb_frame = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB) if len(face_img.shape) == 3 else face_img
                 face_encodings = face_recognition.face_encodings(rgb_frame, [face_location])
                 if len(face_encodings) == 0:
                     return "Unknown"
-                face_encoding = face_encodings[0]
-                best_match = "Unknown"
-                best_distance = 0.40
-                for student_name, known_encodings in self.known_face_encodings.items():
-                    distances = face_recognition.face_distance(known_encodings, face_encoding)
-                    min_distance = min(distances) if len(distances) > 0 else 1.0
-                    if min_distance < best_distance:
-                        best_distance = min_distance
-                        best_match = student_name
-                return best_match
+                return self._match_encoding(face_encodings[0])
             except Exception as e:
                 return "Unknown"
         else:
             # Fallback to OpenCV histogram method
-            best_match = "Unknown"
-            best_score = float('inf')
+            if self._hist_matrix is None:
+                return "Unknown"
             
-            face_resized = cv2.resize(face_img, (100, 100))
-            
-            for student_name, known_faces in self.known_faces.items():
-                for known_face in known_faces:
-                    known_resized = cv2.resize(known_face, (100, 100))
-                    
-                    # Calculate similarity using histogram comparison
-                    hist_face = cv2.calcHist([face_resized], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
-                    hist_known = cv2.calcHist([known_resized], [0, 1, 2], None, [8, 8, 8], [0, 256, 0, 256, 0, 256])
-                    
-                    hist_face = cv2.normalize(hist_face, hist_face).flatten()
-                    hist_known = cv2.normalize(hist_known, hist_known).flatten()
-                    
-                    score = cv2.compareHist(hist_face, hist_known, cv2.HISTCMP_CHISQR)
-                    
-                    if score < best_score:
-                        best_score = score
-                        best_match = student_name
+            # Same chi-square as cv2.compareHist(query, known, HISTCMP_CHISQR) against every known face
+            best, score = _chi_square_argmin(self._hist_matrix, self._face_histogram(face_img))
             
             # Threshold for matching
-            if best_score < 500:
-                return best_match
+            if score < 500:
+                return str(self._hist_labels[best])
             return "Unknown"
     
+    def _draw_face_box(self, frame, left, top, right, bottom, status_text, color, thickness):
+        """Draw a face rectangle with a filled label above it"""
+        cv2.rectangle(frame, (left, top), (right, bottom), color, thickness)
+        text_size = _text_size(status_text, 0.7, 2)
+        cv2.rectangle(frame, (left, top - text_size[1] - 10),
+                    (left + text_size[0], top), color, -1)
+        cv2.putText(frame, status_text, (left, top - 5),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    
+    def _annotate_face(self, frame, left, top, right, bottom, status_text, color, thickness):
+        """Draw a face box and remember it so still frames can redraw it"""
+        self._draw_face_box(frame, left, top, right, bottom, status_text, color, thickness)
+        self._last_annotations.append((left, top, right, bottom, status_text, color, thickness))
+    
+    @staticmethod
+    def _start_face_tracker(gray_frame, left, top, right, bottom):
+        """MOSSE correlation tracker on a face box, or None without opencv-contrib"""
+        legacy = getattr(cv2, 'legacy', None)
+        if legacy is None or not hasattr(legacy, 'TrackerMOSSE_create') or right <= left or bottom <= top:
+            return None
+        tracker = legacy.TrackerMOSSE_create()
+        tracker.init(gray_frame, (left, top, right - left, bottom - top))
+        return tracker
+    
+    def _track_annotations(self, gray_frame):
+        """Move the last face boxes along with the faces; boxes whose tracker loses the face are dropped"""
+        annotations = []
+        trackers = []
+        for annotation, tracker in zip(self._last_annotations, self._face_trackers):
+            if tracker is not None:
+                ok, (x, y, w, h) = tracker.update(gray_frame)
+                if not ok:
+                    continue
+                x, y = int(x), int(y)
+                annotation = (x, y, x + int(w), y + int(h)) + annotation[4:]
+            annotations.append(annotation)
+            trackers.append(tracker)
+        self._last_annotations = annotations
+        self._face_trackers = trackers
+    
+    def _downscale_rgb(self, rgb_frame, scale, interpolation=cv2.INTER_AREA):
+        """Resize rgb_frame by scale into _detect_rgb_buf, which is reused while the size holds"""
+        h, w = rgb_frame.shape[:2]
+        dsize = (max(1, round(w * scale)), max(1, round(h * scale)))
+        self._detect_rgb_buf = _frame_buffer(self._detect_rgb_buf, (dsize[1], dsize[0], 3))
+        return cv2.resize(rgb_frame, dsize, dst=self._detect_rgb_buf, interpolation=interpolation)
+    
     def process_frame(self, frame):
         """
         Process video frame: detect faces, check focus, detect mobile phones
         Shows rectangles for both faces and phones
         """
+        # Colour conversions happen once per frame and are shared by every stage below
+        use_facenet = FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None
+        # With OpenCL the gray conversion, motion check and Haar cascade work on a
+        # UMat (gray_src); gray_frame is the host copy that face crops slice into
+        if self._use_opencl:
+            gray_src = cv2.cvtColor(cv2.UMat(frame), cv2.COLOR_BGR2GRAY)
+            gray_frame = gray_src.get()
+        else:
+            gray_src = gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._eye_cuda is not None:
+            # Uploaded lazily by the first detect_gaze call, so frames without
+            # a recognised face never touch the GPU
+            self._gpu_gray_pending = gray_frame
+        rgb_frame = None
+        if use_facenet or FACE_RECOGNITION_AVAILABLE:
+            # Converted into a buffer kept across frames instead of a fresh ~6 MB array at 1080p
+            self._rgb_buf = _frame_buffer(self._rgb_buf, frame.shape)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        
+        now = time.monotonic()
+        
         # STEP 1: Detect mobile phones in entire frame (if enabled)
         mobile_detected_in_frame = False
         if self.enable_mobile_detection:
-            mobile_detected_in_frame = self.detect_mobile(frame)
+            # Phones don't appear or vanish between consecutive frames, so YOLO
+            # runs on the same _sample_interval cadence as face recognition and
+            # in-between frames reuse the last result and boxes
+            if now - self._last_mobile_submit >= self._sample_interval:
+                self._last_mobile_submit = now
+                self._submit_mobile_frame(frame, gray_frame)
+            mobile_detected_in_frame, mobile_boxes = self._mobile_result
             
             # Draw rectangles around detected phones
-            if mobile_detected_in_frame and hasattr(self, 'mobile_detection_boxes'):
-                for detection in self.mobile_detection_boxes:
+            if mobile_detected_in_frame:
+                for detection in mobile_boxes:
                     x, y, w, h = detection['box']
                     confidence = detection['confidence']
                     
                     # Draw RED rectangle around phone
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 4)
                     
-                    # Add label
-                    label = f"MOBILE {confidence:.2f}"
-                    text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+                    # Add label; confidence is shown in 0.05 steps so the label set
+                    # stays small enough for _text_size to measure each one once
+                    label = f"MOBILE {round(confidence * 20) / 20:.2f}"
+                    text_size = _text_size(label, 0.8, 2)
                     cv2.rectangle(frame, (x, y - text_size[1] - 10), 
                                 (x + text_size[0], y), (0, 0, 255), -1)
                     cv2.putText(frame, label, (x, y - 5), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         
-        # STEP 2: Detect and track student faces
-        if FACENET_AVAILABLE and self.mtcnn is not None and self.resnet is not None:
+        # STEP 2: Detect and track student faces, unless the scene has barely
+        # changed since the last processed frame or the last sample was under
+        # _sample_interval ago; then the last boxes are redrawn.
+        # A full pass is forced every _max_motion_skips frames so nothing goes stale.
+        small_gray = cv2.resize(gray_src, (160, 90))
+        still_frame = (self._prev_small_gray is not None
+                       and self._motion_skips < self._max_motion_skips
+                       and cv2.mean(cv2.absdiff(small_gray, self._prev_small_gray))[0] < 2.0)
+        self._prev_small_gray = small_gray
+        redraw_only = still_frame or now - self._last_sample < self._sample_interval
+        if not redraw_only:
+            self._last_sample = now
+            self._motion_skips = 0
+            self._last_annotations = []
+        
+        if redraw_only:
+            if still_frame:
+                self._motion_skips += 1
+            else:
+                # Between samples the faces are tracked, not re-detected; the
+                # counters only move on sampled frames
+                self._track_annotations(gray_frame)
+            for annotation in self._last_annotations:
+                self._draw_face_box(frame, *annotation)
+        elif use_facenet:
             # ── GPU path: MTCNN detects faces, InceptionResnetV1 encodes ─────
-            import torch
-            from PIL import Image as PILImage
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             img_pil = PILImage.fromarray(rgb_frame)
-            boxes, _ = self.mtcnn.detect(img_pil)  # detect without cropping
+            scale = min(1.0, FACE_DETECT_MAX_SIDE / max(rgb_frame.shape[:2]))
+            if scale < 1.0:
+                small_rgb = self._downscale_rgb(rgb_frame, scale)
+                boxes, _ = self.mtcnn.detect(PILImage.fromarray(small_rgb))  # detect without cropping
+                if boxes is not None:
+                    boxes = boxes / scale  # back to full-frame coordinates
+            else:
+                boxes, _ = self.mtcnn.detect(img_pil)  # detect without cropping
             if boxes is None:
-                boxes = []
-            for box in boxes:
-                left, top, right, bottom = [max(0, int(v)) for v in box]
-                face_region = frame[top:bottom, left:right]
-                if face_region.size == 0:
-                    continue
-                student_name = self.match_face(face_region)
+                boxes = np.empty((0, 4), dtype=np.float32)
+            pixel_boxes = [[max(0, int(v)) for v in box] for box in boxes]
+            keep = [frame[top:bottom, left:right].size > 0 for left, top, right, bottom in pixel_boxes]
+            boxes = boxes[np.array(keep, dtype=bool)]
+            pixel_boxes = [box for box, kept in zip(pixel_boxes, keep) if kept]
+            student_names = None
+            if self._emb_matrix is not None:
+                # Align and embed every face from the detected boxes in one batch
+                try:
+                    student_names = self._match_embeddings(self._facenet_embed_batch(img_pil, boxes))
+                except Exception:
+                    student_names = None
+            if student_names is None:
+                student_names = [self.match_face(frame[top:bottom, left:right],
+                                                 face_rgb=rgb_frame[top:bottom, left:right])
+                                 for left, top, right, bottom in pixel_boxes]
+            for (left, top, right, bottom), student_name in zip(pixel_boxes, student_names):
                 if student_name != "Unknown" and student_name in self.student_data:
-                    is_focused = self.detect_gaze(face_region)
-                    self.student_data[student_name]['total_checks'] += 1
+                    is_focused = self.detect_gaze(gray_frame[top:bottom, left:right],
+                                                  (left, top, right, bottom))
+                    stats = self.student_data[student_name]
+                    stats['total_checks'] += 1
                     if is_focused:
-                        self.student_data[student_name]['focused_count'] += 1
+                        stats['focused_count'] += 1
                         status_text = f"{student_name}: Focused"
                         color = (0, 255, 0)
                     else:
-                        self.student_data[student_name]['unfocused_count'] += 1
+                        stats['unfocused_count'] += 1
                         status_text = f"{student_name}: Not Focused"
                         color = (0, 165, 255)
                     if mobile_detected_in_frame:
-                        self.student_data[student_name]['mobile_detected'] += 1
+                        stats['mobile_detected'] += 1
                         current_time = datetime.now().strftime("%H:%M:%S")
-                        self.student_data[student_name]['mobile_times'].append(current_time)
-                    cv2.rectangle(frame, (left, top), (right, bottom), color, 3)
-                    text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(frame, (left, top - text_size[1] - 10),
-                                (left + text_size[0], top), color, -1)
-                    cv2.putText(frame, status_text, (left, top - 5),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                        stats['mobile_times'].append(current_time)
+                    self._annotate_face(frame, left, top, right, bottom, status_text, color, 3)
                 else:
-                    cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-                    status_text = "Unknown"
-                    text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(frame, (left, top - text_size[1] - 10),
-                                (left + text_size[0], top), (0, 0, 255), -1)
-                    cv2.putText(frame, status_text, (left, top - 5),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    self._annotate_face(frame, left, top, right, bottom, "Unknown", (0, 0, 255), 2)
         elif FACE_RECOGNITION_AVAILABLE:
             # ── CPU fallback: dlib face_recognition ──────────────────────────
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame, model=FACE_RECOGNITION_MODEL)
+            # Detect on a quarter-size frame (16x fewer pixels); boxes are scaled
+            # back up so encodings still use the full-resolution face
+            small_rgb = self._downscale_rgb(rgb_frame, 0.25, cv2.INTER_LINEAR)
+            face_locations = [
+                (top * 4, right * 4, bottom * 4, left * 4)
+                for (top, right, bottom, left) in
+                face_recognition.face_locations(
+                    small_rgb,
+                    # CNN on GPU doesn't need the 2x upsample HOG relies on for small faces
+                    number_of_times_to_upsample=0 if FACE_RECOGNITION_MODEL == "cnn" else 1,
+                    model=FACE_RECOGNITION_MODEL,
+                )
+            ]
             
-            for face_location in face_locations:
+            # Encode every face in one batched call, then match each against the stacked matrix
+            if face_locations and self._enc_matrix is not None:
+                student_names = [
+                    self._match_encoding(encoding)
+                    for encoding in face_recognition.face_encodings(rgb_frame, face_locations)
+                ]
+            else:
+                student_names = ["Unknown"] * len(face_locations)
+            
+            for face_location, student_name in zip(face_locations, student_names):
                 top, right, bottom, left = face_location
-                face_region = frame[top:bottom, left:right]
-                
-                # Match student
-                student_name = self.match_face(rgb_frame, face_location)
                 
                 if student_name != "Unknown" and student_name in self.student_data:
                     # Check focus
-                    is_focused = self.detect_gaze(face_region)
+                    is_focused = self.detect_gaze(gray_frame[top:bottom, left:right],
+                                                  (left, top, right, bottom))
                     
                     # Update stats
-                    self.student_data[student_name]['total_checks'] += 1
+                    stats = self.student_data[student_name]
+                    stats['total_checks'] += 1
                     
                     if is_focused:
-                        self.student_data[student_name]['focused_count'] += 1
+                        stats['focused_count'] += 1
                         status_text = f"{student_name}: Focused"
                         color = (0, 255, 0)  # Green
                     else:
-                        self.student_data[student_name]['unfocused_count'] += 1
+                        stats['unfocused_count'] += 1
                         status_text = f"{student_name}: Not Focused"
                         color = (0, 165, 255)  # Orange
                     
                     # If mobile detected in frame, add to this student's record
                     if mobile_detected_in_frame:
-                        self.student_data[student_name]['mobile_detected'] += 1
+                        stats['mobile_detected'] += 1
                         current_time = datetime.now().strftime("%H:%M:%S")
-                        self.student_data[student_name]['mobile_times'].append(current_time)
-                    
-                    # Draw GREEN/ORANGE rectangle around face
-                    cv2.rectangle(frame, (left, top), (right, bottom), color, 3)
+                        stats['mobile_times'].append(current_time)
                     
-                    # Draw label
-                    text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(frame, (left, top - text_size[1] - 10), 
-                                (left + text_size[0], top), color, -1)
-                    cv2.putText(frame, status_text, (left, top - 5), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    # Draw GREEN/ORANGE rectangle and label around face
+                    self._annotate_face(frame, left, top, right, bottom, status_text, color, 3)
                 else:
                     # Draw RED rectangle for unrecognized / unknown face
-                    cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-                    status_text = "Unknown"
-                    text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(frame, (left, top - text_size[1] - 10),
-                                (left + text_size[0], top), (0, 0, 255), -1)
-                    cv2.putText(frame, status_text, (left, top - 5),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    self._annotate_face(frame, left, top, right, bottom, "Unknown", (0, 0, 255), 2)
         else:
             # OpenCV face detection (fallback)
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+            if self.face_yunet is not None:
+                faces = self._detect_faces_yunet(frame)
+            elif self.face_net is not None:
+                faces = self._detect_faces_dnn(frame)
+            else:
+                # The cascade scans the same capped-size copy MTCNN does; boxes are
+                # scaled back so crops and drawing use the full-resolution frame
+                scale = min(1.0, FACE_DETECT_MAX_SIDE / max(gray_frame.shape[:2]))
+                if scale < 1.0:
+                    detect_gray = cv2.resize(gray_src, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                    faces = [tuple(int(v / scale) for v in box)
+                             for box in self.face_cascade.detectMultiScale(detect_gray, 1.3, 5)]
+                else:
+                    faces = self.face_cascade.detectMultiScale(gray_src, 1.3, 5)
             
             for (x, y, w, h) in faces:
                 face_region = frame[y:y+h, x:x+w]
@@ -861,51 +1941,48 @@ class StudentMonitor:
                 
                 if student_name != "Unknown" and student_name in self.student_data:
                     # Check focus
-                    is_focused = self.detect_gaze(face_region)
+                    is_focused = self.detect_gaze(gray_frame[y:y+h, x:x+w], (x, y, x + w, y + h))
                     
                     # Update stats
-                    self.student_data[student_name]['total_checks'] += 1
+                    stats = self.student_data[student_name]
+                    stats['total_checks'] += 1
                     
                     if is_focused:
-                        self.student_data[student_name]['focused_count'] += 1
+                        stats['focused_count'] += 1
                         status_text = f"{student_name}: Focused"
                         color = (0, 255, 0)  # Green
                     else:
-                        self.student_data[student_name]['unfocused_count'] += 1
+                        stats['unfocused_count'] += 1
                         status_text = f"{student_name}: Not Focused"
                         color = (0, 165, 255)  # Orange
                     
                     # If mobile detected in frame, add to this student's record
                     if mobile_detected_in_frame:
-                        self.student_data[student_name]['mobile_detected'] += 1
+                        stats['mobile_detected'] += 1
                         current_time = datetime.now().strftime("%H:%M:%S")
-                        self.student_data[student_name]['mobile_times'].append(current_time)
+                        stats['mobile_times'].append(current_time)
                     
-                    # Draw GREEN/ORANGE rectangle around face
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 3)
-                    
-                    # Draw label
-                    text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(frame, (x, y - text_size[1] - 10), 
-                                (x + text_size[0], y), color, -1)
-                    cv2.putText(frame, status_text, (x, y - 5), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    # Draw GREEN/ORANGE rectangle and label around face
+                    self._annotate_face(frame, x, y, x + w, y + h, status_text, color, 3)
                 else:
                     # Draw RED rectangle for unrecognized / unknown face
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-                    status_text = "Unknown"
-                    text_size = cv2.getTextSize(status_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-                    cv2.rectangle(frame, (x, y - text_size[1] - 10),
-                                (x + text_size[0], y), (0, 0, 255), -1)
-                    cv2.putText(frame, status_text, (x, y - 5),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    self._annotate_face(frame, x, y, x + w, y + h, "Unknown", (0, 0, 255), 2)
+        
+        if not redraw_only:
+            # Trackers start from the unannotated gray frame, so drawn boxes never
+            # end up in their templates
+            self._face_trackers = [self._start_face_tracker(gray_frame, *annotation[:4])
+                                   for annotation in self._last_annotations]
         
         # STEP 3: Display timer
         if self.start_time:
-            elapsed = int(time.time() - self.start_time)
-            time_text = f"Time: {elapsed}s / {self.check_interval}s"
+            # The text only changes once a second; the overlay is redrawn every frame
+            elapsed = int(now - self.start_time)
+            if elapsed != self._timer_sec:
+                self._timer_sec = elapsed
+                self._timer_text = f"Time: {elapsed}s / {self.check_interval}s"
             cv2.rectangle(frame, (5, 5), (350, 45), (0, 0, 0), -1)
-            cv2.putText(frame, time_text, (10, 30), 
+            cv2.putText(frame, self._timer_text, (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         
         return frame
@@ -925,20 +2002,28 @@ class StudentMonitor:
         """
         Generate comprehensive focus report for all students
         MOBILE REPORTS shown here at END OF SESSION (if enabled)
+        
+        Only the first successful call writes a report; the finally block, atexit
+        and signal paths can all reach here, and later calls return the saved path.
         """
-        print("\n" + "="*70)
-        print("STUDENT FOCUS MONITORING REPORT - END OF SESSION")
-        print("="*70)
-        print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Monitoring Duration: {self.check_interval} seconds")
-        print(f"Focus Threshold: {self.focus_threshold}%")
-        print(f"Mobile Detection: {'Enabled' if self.enable_mobile_detection else 'Disabled'}")
-        print("="*70)
+        if self._report_generated:
+            return self._last_report_path
+        
+        # The summary is assembled first and written to stdout in one call
+        lines = []
+        lines.append("\n" + "="*70)
+        lines.append("STUDENT FOCUS MONITORING REPORT - END OF SESSION")
+        lines.append("="*70)
+        lines.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append(f"Monitoring Duration: {self.check_interval} seconds")
+        lines.append(f"Focus Threshold: {self.focus_threshold}%")
+        lines.append(f"Mobile Detection: {'Enabled' if self.enable_mobile_detection else 'Disabled'}")
+        lines.append("="*70)
         
         # Show mobile phone reports only if feature is enabled
         if self.enable_mobile_detection:
-            print("\n" + "🚨 MOBILE PHONE USAGE REPORTS 🚨")
-            print("="*70)
+            lines.append("\n" + "🚨 MOBILE PHONE USAGE REPORTS 🚨")
+            lines.append("="*70)
             mobile_reports = []
             for student_name, data in self.student_data.items():
                 if data['mobile_detected'] > 0:
@@ -946,20 +2031,22 @@ class StudentMonitor:
             
             if mobile_reports:
                 for student_name, data in mobile_reports:
-                    print(f"\n⚠️  {student_name} REPORT!")
-                    print(f"   Mobile detected: {data['mobile_detected']} times")
-                    print(f"   Times detected:")
-                    for time_detected in data['mobile_times']:
-                        print(f"      - {time_detected}")
+                    lines.append(f"\n⚠️  {student_name} REPORT!")
+                    lines.append(f"   Mobile detected: {data['mobile_detected']} times")
+                    lines.append(f"   Times detected:")
+                    lines.extend(f"      - {time_detected}" for time_detected in data['mobile_times'])
             else:
-                print("\n✓ No mobile phone usage detected during session")
+                lines.append("\n✓ No mobile phone usage detected during session")
         
-        print("\n" + "="*70)
-        print("📊 INDIVIDUAL STUDENT FOCUS REPORTS")
-        print("="*70)
+        lines.append("\n" + "="*70)
+        lines.append("📊 INDIVIDUAL STUDENT FOCUS REPORTS")
+        lines.append("="*70)
         
+        # Computed once per student and reused by _save_report
+        focus_percentages = {}
         for student_name, data in self.student_data.items():
             focus_percentage = self.calculate_focus_percentage(student_name)
+            focus_percentages[student_name] = focus_percentage
             
             # Determine status based on threshold
             if focus_percentage >= self.focus_threshold:
@@ -969,80 +2056,145 @@ class StudentMonitor:
                 status = "✗ NEEDS IMPROVEMENT"
                 status_symbol = "✗"
             
-            print(f"\n{status_symbol} Student: {student_name}")
-            print(f"   Focus Percentage: {focus_percentage}% {status}")
-            print(f"   Focused Count: {data['focused_count']}")
-            print(f"   Unfocused Count: {data['unfocused_count']}")
-            print(f"   Total Checks: {data['total_checks']}")
+            lines.append(f"\n{status_symbol} Student: {student_name}")
+            lines.append(f"   Focus Percentage: {focus_percentage}% {status}")
+            lines.append(f"   Focused Count: {data['focused_count']}")
+            lines.append(f"   Unfocused Count: {data['unfocused_count']}")
+            lines.append(f"   Total Checks: {data['total_checks']}")
             
             if self.enable_mobile_detection and data['mobile_detected'] > 0:
-                print(f"   📱 Mobile Usage: {data['mobile_detected']} times")
+                lines.append(f"   📱 Mobile Usage: {data['mobile_detected']} times")
         
-        print("\n" + "="*70)
+        lines.append("\n" + "="*70)
+        print("\n".join(lines), flush=True)
         
         # Save report to file
-        self._save_report()
-        self._report_generated = True  # Mark that report was generated
+        report_path = self._save_report(focus_percentages)
+        if report_path:
+            if self._checkpoint_path:
+                try:
+                    os.remove(self._checkpoint_path)
+                except OSError:
+                    pass
+            self._last_report_path = report_path
+            self._report_generated = True  # Mark that report was generated
+            atexit.unregister(self._cleanup_and_report)
+        return report_path
+    
+    def generate_report_jsonl(self, path):
+        """
+        Append one JSON line per student whose stats changed since the last checkpoint
+        
+        Args:
+            path: JSON Lines file to append to
+        
+        Returns:
+            Number of student records written
+        """
+        now = datetime.now().isoformat()
+        lines = []
+        for student_name, data in self.student_data.items():
+            checks = (data['total_checks'], data['mobile_detected'])
+            if self._checkpointed_checks.get(student_name) == checks:
+                continue
+            self._checkpointed_checks[student_name] = checks
+            entry = self._student_report_entry(student_name, data)
+            entry['student'] = student_name
+            entry['time'] = now
+            lines.append(json.dumps(entry) + '\n')
+        if lines:
+            with open(path, 'a', buffering=REPORT_WRITE_BUFFER) as f:
+                f.write(''.join(lines))
+        return len(lines)
+    
+    def _student_report_entry(self, student_name, data, focus_percentage=None):
+        """Build one student's report entry, or minimal data if their record is malformed"""
+        try:
+            focused, unfocused, total, mobile, mobile_times, alerts = _report_fields(data)
+            if focus_percentage is None:
+                focus_percentage = round(focused / total * 100, 2) if total else 0
+            return {
+                'focus_percentage': focus_percentage,
+                'focused_count': focused,
+                'unfocused_count': unfocused,
+                'total_checks': total,
+                'mobile_detected': mobile,
+                'mobile_times': mobile_times,
+                'alerts': alerts
+            }
+        except Exception as e:
+            print(f"⚠️  Error processing student {student_name}: {e}")
+            # Add minimal data
+            return {
+                'focus_percentage': 0.0,
+                'focused_count': 0,
+                'unfocused_count': 0,
+                'total_checks': 0,
+                'mobile_detected': 0,
+                'mobile_times': [],
+                'alerts': []
+            }
     
-    def _save_report(self):
-        """Save report to JSON file"""
+    def _save_report(self, focus_percentages=None):
+        """Save report to JSON file, reusing focus percentages already computed by generate_report"""
+        if focus_percentages is None:
+            focus_percentages = {}
+        # One clock read serves the report timestamp and both file names
+        now = datetime.now()
+        file_stamp = now.strftime('%Y%m%d_%H%M%S')
         try:
             report = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': now.isoformat(),
                 'duration': self.check_interval,
                 'threshold': self.focus_threshold,
                 'mobile_detection_enabled': self.enable_mobile_detection,
                 'students': {}
             }
             
-            for student_name, data in self.student_data.items():
-                try:
-                    report['students'][student_name] = {
-                        'focus_percentage': self.calculate_focus_percentage(student_name),
-                        'focused_count': data['focused_count'],
-                        'unfocused_count': data['unfocused_count'],
-                        'total_checks': data['total_checks'],
-                        'mobile_detected': data['mobile_detected'],
-                        'mobile_times': data['mobile_times'],
-                        'alerts': data['alerts']
-                    }
-                except Exception as e:
-                    print(f"⚠️  Error processing student {student_name}: {e}")
-                    # Add minimal data
-                    report['students'][student_name] = {
-                        'focus_percentage': 0.0,
-                        'focused_count': 0,
-                        'unfocused_count': 0,
-                        'total_checks': 0,
-                        'mobile_detected': 0,
-                        'mobile_times': [],
-                        'alerts': []
-                    }
+            report['students'] = {
+                student_name: self._student_report_entry(
+                    student_name, data, focus_percentages.get(student_name)
+                )
+                for student_name, data in self.student_data.items()
+            }
             
-            report_filename = f"focus_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            report_path = os.path.abspath(report_filename)
+            # Reports never change after saving, so store the absentees with them
+            if self.registered_students is not None:
+                report['absent_students'] = sorted(
+                    set(self.registered_students).difference(report['students'])
+                )
             
-            with open(report_filename, 'w') as f:
-                json.dump(report, f, indent=4)
+            report_filename = f"focus_report_{file_stamp}.json"
+            report_path = os.path.join(self._report_dir, report_filename)
+            
+            # The large write buffer batches the encoder's output into few write calls;
+            # written beside the target and swapped in, so the dashboard never reads a partial file
+            tmp_path = report_path + '.tmp'
+            with open(tmp_path, 'wb', buffering=REPORT_WRITE_BUFFER) as f:
+                _write_report_json(f, report)
+                _flush_to_disk(f)
+            os.replace(tmp_path, report_path)
             
             print(f"\n✅ Report saved successfully!")
             print(f"   File: {report_filename}")
             print(f"   Path: {report_path}")
             print(f"   Students: {len(report['students'])}")
             
-            return report_filename
+            return report_path
             
         except Exception as e:
             print(f"\n❌ ERROR saving report: {e}")
-            print(f"   Attempted path: {os.getcwd()}")
+            print(f"   Attempted path: {self._report_dir}")
             
             # Try to save to a backup location
             try:
-                backup_filename = f"focus_report_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                backup_filename = f"focus_report_backup_{file_stamp}.json"
                 import tempfile
                 backup_path = os.path.join(tempfile.gettempdir(), backup_filename)
-                with open(backup_path, 'w') as f:
-                    json.dump(report, f, indent=4)
+                with open(backup_path + '.tmp', 'wb', buffering=REPORT_WRITE_BUFFER) as f:
+                    _write_report_json(f, report)
+                    _flush_to_disk(f)
+                os.replace(backup_path + '.tmp', backup_path)
                 print(f"⚠️  Backup report saved to: {backup_path}")
                 return backup_path
             except Exception as backup_error:
@@ -1055,7 +2207,11 @@ class StudentMonitor:
         self.should_stop = True
     
     def _check_stop_signal(self):
-        """Check if stop signal file exists (Windows-compatible shutdown)"""
+        """Check if stop signal file exists (Windows-compatible shutdown), at most every 0.5s"""
+        now = time.monotonic()
+        if now - self._last_stop_check < self._stop_check_interval:
+            return False
+        self._last_stop_check = now
         if os.path.exists(self.stop_file):
             try:
                 os.remove(self.stop_file)
@@ -1064,6 +2220,68 @@ class StudentMonitor:
             return True
         return False
     
+    def watch_stdin_for_stop(self):
+        """
+        End the session when a byte (or EOF) arrives on stdin, so a parent that started
+        us with stdin=PIPE can stop us immediately instead of through the stop file
+        """
+        def _wait_for_stdin():
+            try:
+                sys.stdin.buffer.read(1)
+            except (AttributeError, OSError, ValueError):
+                return  # no usable stdin
+            self.should_stop = True
+        
+        threading.Thread(target=_wait_for_stdin, daemon=True).start()
+    
+    def _capture_worker(self, cap):
+        """
+        Background thread: keep grabbing camera frames so the device never queues stale
+        ones, but only decode (retrieve) a frame when the monitor loop is waiting for one
+        """
+        while not self._capture_stop.is_set():
+            ret = cap.grab()
+            if ret and not self._frame_wanted.is_set():
+                continue  # nobody is waiting: drop the frame without decoding it
+            frame = None
+            if ret:
+                ret, frame = cap.retrieve()
+            with self._frame_cond:
+                if ret:
+                    self._frame_wanted.clear()
+                    self._latest_frame = frame
+                    self._frame_seq += 1
+                else:
+                    self._capture_failed = True
+                self._frame_cond.notify()
+            if not ret:
+                break
+    
+    def _wait_for_frame(self, last_seq, timeout=FRAME_STALL_TIMEOUT):
+        """
+        Wait for a frame newer than last_seq from the reader thread. A slow grab
+        (camera re-negotiating, USB hiccup, busy machine) is waited out for as long
+        as the reader thread is alive and has not reported a failure, up to timeout
+        seconds.
+        
+        Returns:
+            (seq, frame), or (last_seq, None) if capture failed, the reader thread
+            exited, or no frame arrived within timeout
+        """
+        self._frame_wanted.set()
+        deadline = time.monotonic() + timeout
+        with self._frame_cond:
+            while self._frame_seq == last_seq and not self._capture_failed:
+                remaining = deadline - time.monotonic()
+                thread = self._capture_thread
+                if remaining <= 0 or thread is None or not thread.is_alive():
+                    break
+                # Wake periodically so a reader thread that died without notifying is noticed
+                self._frame_cond.wait(min(remaining, 1.0))
+            if self._frame_seq == last_seq:
+                return last_seq, None
+            return self._frame_seq, self._latest_frame
+    
     def start_monitoring(self, camera_index=0):
         """
         Start real-time monitoring using webcam
@@ -1071,9 +2289,11 @@ class StudentMonitor:
         Args:
             camera_index: Camera device index (default: 0 for primary webcam)
         """
-        # Register signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+        # Register signal handlers for graceful shutdown; Python only allows this on
+        # the main thread, so an embedding app running us in a worker skips it
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
         
         # Register cleanup function to run on exit
         atexit.register(self._cleanup_and_report)
@@ -1083,6 +2303,9 @@ class StudentMonitor:
         if not cap.isOpened():
             print("Error: Could not open camera")
             return
+        
+        # Keep only the newest frame queued so every read reflects the classroom now
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
         # ── Signal audio_recorder.py that the camera is ready ─────────────────
         try:
@@ -1104,6 +2327,12 @@ class StudentMonitor:
             )
             self._audio_thread.start()
         
+        # ── Mobile detection runs alongside face processing ───────────────────
+        if self.enable_mobile_detection:
+            self._mobile_queue = queue.Queue(maxsize=1)
+            self._mobile_thread = threading.Thread(target=self._mobile_worker, daemon=True)
+            self._mobile_thread.start()
+        
         print("\n" + "="*70)
         print("STARTING STUDENT FOCUS MONITOR")
         print("="*70)
@@ -1111,7 +2340,9 @@ class StudentMonitor:
         print(f"Check interval: {self.check_interval} seconds")
         print(f"Focus threshold: {self.focus_threshold}%")
         if self.enable_mobile_detection:
-            if self.yolo_model is not None:
+            if self._yolo_net is not None:
+                print(f"Mobile Detection: YOLOv8l ONNX via OpenCV DNN (confidence > 0.25)")
+            elif self.yolo_model is not None:
                 print(f"Mobile Detection: YOLOv8l (confidence > 0.25)")
             else:
                 print(f"Mobile Detection: Basic edge detection (YOLOv8l unavailable)")
@@ -1120,14 +2351,29 @@ class StudentMonitor:
         print("\nPress 'q' to quit and generate report")
         print("="*70 + "\n")
         
-        self.start_time = time.time()
+        # ── Camera reads overlap with processing and display ──────────────────
+        self._capture_stop = threading.Event()
+        self._capture_failed = False
+        self._frame_wanted.clear()
+        self._capture_thread = threading.Thread(target=self._capture_worker, args=(cap,), daemon=True)
+        self._capture_thread.start()
+        
+        self.start_time = time.monotonic()
         frame_count = 0
+        frame_seq = 0
+        self._checkpoint_path = os.path.join(
+            self._report_dir, f"focus_checkpoint_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        )
+        self._checkpointed_checks = {}
+        self._last_checkpoint = self.start_time
+        # The HighGUI window still needs a periodic waitKey to repaint and see 'q'
+        waitkey_every = 4 if msvcrt is not None else 1
         
         try:
             while True:
-                ret, frame = cap.read()
+                frame_seq, frame = self._wait_for_frame(frame_seq)
                 
-                if not ret:
+                if frame is None:
                     print("Error: Failed to capture frame")
                     break
                 
@@ -1135,18 +2381,38 @@ class StudentMonitor:
                 processed_frame = self.process_frame(frame)
                 
                 # Display frame
+                height, width = processed_frame.shape[:2]
+                if width > DISPLAY_MAX_WIDTH:
+                    processed_frame = cv2.resize(
+                        processed_frame,
+                        (DISPLAY_MAX_WIDTH, height * DISPLAY_MAX_WIDTH // width),
+                        interpolation=cv2.INTER_AREA,
+                    )
                 cv2.imshow('Student Focus Monitor', processed_frame)
                 
                 frame_count += 1
                 
-                # Check if monitoring duration elapsed
-                elapsed_time = time.time() - self.start_time
-                if elapsed_time >= self.check_interval:
-                    print("\n✓ Monitoring period completed!")
-                    break
+                # Check if monitoring duration elapsed; every 16th frame is
+                # well under a second at camera rates
+                if frame_count & 15 == 0:
+                    now = time.monotonic()
+                    if now - self.start_time >= self.check_interval:
+                        print("\n✓ Monitoring period completed!")
+                        break
+                    
+                    # Append changed students only, so checkpoints cost O(new data)
+                    if now - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+                        self._last_checkpoint = now
+                        try:
+                            self.generate_report_jsonl(self._checkpoint_path)
+                        except Exception as e:
+                            print(f"⚠️  Checkpoint failed: {e}")
                 
                 # Check for quit command
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if msvcrt is not None and msvcrt.kbhit() and msvcrt.getch() in (b'q', b'Q'):
+                    print("\n✓ Monitoring stopped by user (Q pressed)")
+                    break
+                if frame_count % waitkey_every == 0 and cv2.waitKey(1) & 0xFF == ord('q'):
                     print("\n✓ Monitoring stopped by user (Q pressed)")
                     break
                 
@@ -1169,6 +2435,19 @@ class StudentMonitor:
             if self._audio_thread is not None and self._audio_thread.is_alive():
                 print("⏳ Waiting for Whisper to finish last chunk...")
                 self._audio_thread.join(timeout=15)
+            # Stop mobile detection thread
+            if self._mobile_thread is not None:
+                try:
+                    self._mobile_queue.put(None, timeout=5)
+                except queue.Full:
+                    pass
+                self._mobile_thread.join(timeout=5)
+                self._mobile_thread = None
+            # Stop the camera reader before releasing the device it reads from
+            if self._capture_thread is not None:
+                self._capture_stop.set()
+                self._capture_thread.join(timeout=2)
+                self._capture_thread = None
             # Cleanup
             cap.release()
             cv2.destroyAllWindows()
@@ -1183,17 +2462,14 @@ class StudentMonitor:
             print("\n📊 Emergency cleanup: Generating final report...")
             try:
                 self.generate_report()
-                self._report_generated = True
             except Exception as e:
                 print(f"⚠️  Error generating emergency report: {e}")
-                import traceback
                 traceback.print_exc()
 
 
 def main():
     """Main function to run the student monitor"""
     import argparse
-    import json
     
     print("\n" + "="*70)
     print("Sahayak AI")
@@ -1204,19 +2480,19 @@ def main():
     parser.add_argument('--duration', type=int, help='Monitoring duration in seconds')
     parser.add_argument('--threshold', type=int, help='Focus threshold percentage')
     parser.add_argument('--enable-mobile-detection', action='store_true', help='Enable mobile phone detection')
+    parser.add_argument('--stop-on-stdin', action='store_true', help='End the session when stdin receives a byte or closes')
     args = parser.parse_args()
     
-    # Try to load config from Streamlit app
+    # Try to load config from Streamlit app; not needed when the CLI sets everything
     config_file = 'monitor_config.json'
-    if os.path.exists(config_file):
+    config = {}
+    if not (args.duration and args.threshold and args.enable_mobile_detection):
         try:
             with open(config_file, 'r') as f:
                 config = json.load(f)
                 print(f"\n✓ Loaded configuration from {config_file}")
-        except:
+        except (OSError, ValueError):
             config = {}
-    else:
-        config = {}
     
     # Configuration (priority: CLI args > config file > defaults)
     STUDENT_PHOTOS_PATH = "sample_student_photos"  # Folder containing student zip files
@@ -1232,6 +2508,9 @@ def main():
         enable_mobile_detection=ENABLE_MOBILE_DETECTION
     )
     
+    if args.stop_on_stdin:
+        monitor.watch_stdin_for_stop()
+    
     # Start monitoring
     monitor.start_monitoring()
 
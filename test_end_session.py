@@ -2,31 +2,49 @@
 Test script to verify report generation on end session
 """
 
+import asyncio
 import subprocess
 import time
 import os
 import sys
 import json
+import signal
+import traceback
+from contextlib import suppress
+from pathlib import Path
+
+def find_reports(prefix='focus_report_'):
+    """
+    (name, size) of the <prefix>*.json files in the current directory, from one scandir
+    pass; sizes come from the DirEntry instead of a second stat by path
+    """
+    with os.scandir('.') as entries:
+        return [(e.name, e.stat().st_size) for e in entries
+                if e.name.startswith(prefix) and e.name.endswith('.json')]
 
 def test_end_session():
     """Test that ending a session generates a report"""
+    return asyncio.run(_test_end_session())
+
+async def _test_end_session():
+    """
+    Body of test_end_session. The monitor runs as an asyncio subprocess, so its exit
+    is delivered by the event loop's child watcher instead of Popen.wait()'s sleep-and-poll
+    """
     print("\n" + "="*70)
     print("TESTING END SESSION REPORT GENERATION")
     print("="*70)
     
-    # Clean up old files
-    if os.path.exists('monitor_stop.signal'):
+    # Clean up old files; a failed remove skips its message
+    with suppress(FileNotFoundError):
         os.remove('monitor_stop.signal')
         print("✓ Cleaned old stop signal")
     
     # Remove old test reports
-    test_reports = [f for f in os.listdir('.') if f.startswith('focus_report_') and f.endswith('.json')]
-    for report in test_reports:
-        try:
+    for report, _ in find_reports():
+        with suppress(OSError):
             os.remove(report)
             print(f"✓ Removed old test report: {report}")
-        except:
-            pass
     
     # Create config for 30-second test
     config = {
@@ -35,8 +53,13 @@ def test_end_session():
         'enable_mobile_detection': False
     }
     
-    with open('monitor_config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    # Serialized up front and handed to the OS in one write(2), no file object layers
+    payload = json.dumps(config, indent=4).encode('utf-8')
+    fd = os.open('monitor_config.json', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
     
     print("\n✓ Created test configuration (30 seconds)")
     
@@ -45,57 +68,91 @@ def test_end_session():
     print("   (A camera window should open)")
     
     try:
-        process = subprocess.Popen(
-            [sys.executable, 'student_monitor.py'],
+        # On POSIX the monitor is stopped with SIGTERM, which its handler turns into
+        # the in-memory stop flag. Windows can't deliver that to a process in its own
+        # console, so there the monitor instead stops when a byte arrives on stdin.
+        use_stdin_stop = os.name == 'nt'
+        monitor_args = ['student_monitor.py'] + (['--stop-on-stdin'] if use_stdin_stop else [])
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, *monitor_args,
+            stdin=asyncio.subprocess.PIPE if use_stdin_stop else None,
             cwd=os.getcwd(),
             creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
         )
+        exited = asyncio.ensure_future(process.wait())
         
         print("✓ Process started (PID: {})".format(process.pid))
         
-        # Wait 10 seconds
+        # Let the monitor run for up to 10 seconds. Each step waits on the exit
+        # itself, so a monitor that dies during start-up ends the wait at once; the
+        # steps only pace the countdown (100 ms, backing off to 1 s)
         print("\n⏳ Waiting 10 seconds...")
-        for i in range(10, 0, -1):
-            print(f"   {i}...", end='\r')
-            time.sleep(1)
+        deadline = time.monotonic() + 10
+        interval = 0.1
+        # The live countdown is for terminals only; piped to a log it would just add
+        # a line per step, so there the start and end messages stand alone
+        is_tty = sys.stdout.isatty()
+        write = sys.stdout.write
+        shown = None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if is_tty and int(remaining) + 1 != shown:
+                shown = int(remaining) + 1
+                write(f"\r   {shown}...  ")
+                sys.stdout.flush()
+            try:
+                await asyncio.wait_for(asyncio.shield(exited), min(interval, remaining))
+                print(f"\n⚠️  Monitor exited early (code {process.returncode})")
+                break
+            except asyncio.TimeoutError:
+                pass
+            interval = min(interval * 1.5, 1.0)
         
         print("\n\n🛑 Sending stop signal...")
         
-        # Create stop signal file
-        with open('monitor_stop.signal', 'w') as f:
-            f.write('stop')
-        print("✓ Stop signal file created")
+        try:
+            if use_stdin_stop:
+                process.stdin.write(b'q')
+                await process.stdin.drain()
+                process.stdin.close()
+            else:
+                process.send_signal(signal.SIGTERM)
+            print("✓ Stop signal sent")
+        except OSError:
+            print("⚠️  Monitor is no longer running to receive the stop signal")
         
         # Wait for graceful shutdown
         print("\n⏳ Waiting for process to generate report and exit...")
         try:
-            process.wait(timeout=15)
+            await asyncio.wait_for(exited, 15)
             print("✓ Process ended gracefully")
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             print("⚠️  Process didn't exit in time, forcing...")
-            process.kill()
-            process.wait()
+            with suppress(ProcessLookupError):
+                process.kill()
+            await process.wait()
         
-        # Wait a bit more for file I/O
-        time.sleep(2)
+        # The monitor writes its report before exiting (tmp file + os.replace),
+        # so once wait() returns there is nothing left to flush
         
         # Check for report
         print("\n" + "="*70)
         print("CHECKING FOR REPORTS")
         print("="*70)
         
-        reports = [f for f in os.listdir('.') if f.startswith('focus_report_') and f.endswith('.json')]
+        reports = find_reports()
         
         if reports:
             print(f"\n✅ SUCCESS! Found {len(reports)} report(s):")
-            for report in reports:
-                file_size = os.path.getsize(report)
+            for report, file_size in reports:
                 print(f"   ✓ {report} ({file_size} bytes)")
                 
                 # Show report contents
                 try:
-                    with open(report, 'r') as f:
-                        data = json.load(f)
+                    # One bulk read straight into the bytes path of the JSON parser
+                    data = json.loads(Path(report).read_bytes())
                     print(f"      - Timestamp: {data.get('timestamp', 'N/A')}")
                     print(f"      - Students: {len(data.get('students', {}))}")
                     print(f"      - Duration: {data.get('duration', 'N/A')}s")
@@ -110,10 +167,10 @@ def test_end_session():
             print("\n❌ TEST FAILED! No reports found.")
             print("\nChecking for issues...")
             print(f"   - Current directory: {os.getcwd()}")
-            print(f"   - Monitor stopped: {process.poll() is not None}")
+            print(f"   - Monitor stopped: {process.returncode is not None}")
             
             # List all JSON files
-            all_json = [f for f in os.listdir('.') if f.endswith('.json')]
+            all_json = [name for name, _ in find_reports(prefix='')]
             print(f"   - All JSON files: {all_json}")
             
             print("\n" + "="*70)
@@ -123,7 +180,6 @@ def test_end_session():
             
     except Exception as e:
         print(f"\n❌ Error during test: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
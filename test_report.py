@@ -12,8 +12,10 @@ def create_test_report():
     
     print("Creating test report...")
     
+    # One clock read, so the file name and the timestamp inside it always agree
+    now = datetime.now()
     report = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now.isoformat(),
         'duration': 60,
         'threshold': 50,
         'students': {
@@ -38,11 +40,14 @@ def create_test_report():
         }
     }
     
-    filename = f"focus_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    filepath = os.path.abspath(filename)
+    filename = f"focus_report_{now.strftime('%Y%m%d_%H%M%S')}.json"
+    # filename is a bare name in the working directory, so no normalization is needed
+    filepath = os.path.join(os.getcwd(), filename)
     
+    # Serialize first so the file gets the whole document in one write
+    payload = json.dumps(report, indent=4)
     with open(filename, 'w') as f:
-        json.dump(report, f, indent=4)
+        f.write(payload)
     
     print(f"✅ Test report created successfully!")
     print(f"   File: {filename}")
@@ -0,0 +1,74 @@
+"""
+Test Training Robustness
+Checks that one undecodable photo in a training batch doesn't stop the others
+"""
+
+import os
+import sys
+import tempfile
+import traceback
+
+import cv2
+import numpy as np
+
+from student_monitor import StudentMonitor
+
+def _write_photos(folder, count):
+    """Write count small decodable PNGs and one corrupt .jpg; returns (path, student) pairs"""
+    images = []
+    for i in range(count):
+        path = os.path.join(folder, f"student_{i}.png")
+        ok, buf = cv2.imencode('.png', np.full((120, 120, 3), 40 * i, dtype=np.uint8))
+        assert ok
+        with open(path, 'wb') as f:
+            f.write(buf.tobytes())
+        images.append((path, f"student_{i}"))
+    corrupt = os.path.join(folder, "corrupt.jpg")
+    with open(corrupt, 'wb') as f:
+        f.write(b"not an image")
+    # In the middle of the batch, so photos on both sides of it must still be trained
+    images.insert(count // 2, (corrupt, "student_corrupt"))
+    return images
+
+def test_corrupt_photo_in_batch():
+    """Train a facenet batch containing one undecodable file"""
+    print("\n" + "="*70)
+    print("TESTING TRAINING WITH AN UNDECODABLE PHOTO")
+    print("="*70)
+
+    try:
+        # __init__ loads every detection model; the batch path only needs these stores
+        monitor = StudentMonitor.__new__(StudentMonitor)
+        monitor.student_data = {}
+        monitor.known_faces = {}
+        monitor.facenet_embeddings = {}
+        monitor.mtcnn = None
+        monitor.resnet = None
+        monitor.face_cascade = None
+        # Stand-in for the GPU embedding: every decodable photo counts as trained
+        monitor._train_facenet_bucket = lambda bucket: len(bucket)
+
+        with tempfile.TemporaryDirectory() as folder:
+            images = _write_photos(folder, 3)
+
+            result = monitor._train_on_image(*images[1])
+            if result is not False:
+                print(f"❌ TEST FAILED! _train_on_image returned {result!r} for a corrupt file")
+                return False
+            print("✓ _train_on_image returns False for a corrupt file")
+
+            trained = monitor._train_facenet_batched(images)
+            if trained != 3:
+                print(f"❌ TEST FAILED! Trained on {trained} of 3 decodable photos")
+                return False
+            print("✓ All 3 decodable photos trained; the corrupt one was skipped")
+
+        print("\n✅ TEST PASSED!")
+        return True
+    except Exception as e:
+        print(f"\n❌ Error during test: {e}")
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    sys.exit(0 if test_corrupt_photo_in_batch() else 1)
@@ -0,0 +1,73 @@
+"""
+Training photo helpers for student_monitor.py
+Reading, decoding and dlib-encoding student photos from folders or zip files.
+
+Kept free of heavy imports (torch, whisper, facenet): on Windows the training
+process pool spawns its workers, and every worker imports this module to
+unpickle encode_image.
+"""
+
+import io
+import os
+import zipfile
+
+import numpy as np
+
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:
+    PILImage = ImageOps = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def open_image_source(src):
+    """
+    Binary file object for a training image: src is a file path, or a
+    (zip path, member name) pair that is read straight out of the zip
+    """
+    if isinstance(src, tuple):
+        zip_path, member = src
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            return io.BytesIO(zip_ref.read(member))
+    return open(src, 'rb')
+
+
+def image_label(src):
+    """Short file name of a training image source, for log lines"""
+    return os.path.basename(src[1] if isinstance(src, tuple) else src)
+
+
+def decode_image(img_path):
+    """
+    Decode an image source to an upright RGB uint8 array; None on failure.
+    Phone photos are stored sideways with an EXIF orientation tag, which is
+    applied here so the face detectors see the face the right way up.
+    """
+    try:
+        with open_image_source(img_path) as fp, PILImage.open(fp) as img:
+            return np.array(ImageOps.exif_transpose(img).convert('RGB'))
+    except Exception:
+        return None
+
+
+def encode_image(img_path, student_name, model):
+    """
+    Process-pool worker: dlib encoding of the first face in one training image,
+    detected with the given face_recognition model ("hog" or "cnn").
+
+    Returns (img_path, student_name, encoding) where encoding is None when no
+    face was found, or the string 'error' when face_recognition failed.
+    """
+    try:
+        import face_recognition  # only workers pay for it; the parent already checked it works
+        image = decode_image(img_path)
+        if image is None:
+            return img_path, student_name, 'error'
+        face_locations = face_recognition.face_locations(image, model=model)
+        face_encodings = face_recognition.face_encodings(
+            image, known_face_locations=face_locations, num_jitters=10
+        )
+        return img_path, student_name, (face_encodings[0] if face_encodings else None)
+    except Exception:
+        return img_path, student_name, 'error'